@@ -0,0 +1,295 @@
+"""
+Offline benchmark of variable extraction.
+
+Runs the real default TypeSet and data_extractor.extract_var against a fake
+gdb module whose inferior memory is a bytearray, so that no GDB process or
+compiled program is needed. For each case and size, the throughput in
+elements per second and the peak memory allocated during extraction are
+reported, and the results can be saved as JSON and compared with a previous
+run.
+
+Usage:
+    python benchmarks/bench_extract.py [--sizes 1000,100000] [--cases vector,nested]
+                                       [--repeat 3] [--latency 0.5] [--elementwise]
+                                       [--output results.json]
+                                       [--compare previous.json]
+
+--elementwise extracts the node-based containers (deque, list, map...) one
+element at a time through gdb.Value, as a baseline for their block reads.
+Element-wise extraction of lists is quadratic, so keep the sizes small.
+
+--latency adds a simulated round trip time, in milliseconds, to every memory
+read, as when debugging over a slow connection to a remote target.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "fake_gdb"))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import numpy as np  # noqa: E402
+
+import gdb  # noqa: E402
+import inferior  # noqa: E402
+from gdbplotlib import data_extractor  # noqa: E402
+from gdbplotlib import std_types  # noqa: E402
+from gdbplotlib.default import default  # noqa: E402
+from gdbplotlib.type_handler import TypeHandler  # noqa: E402
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+
+
+def setup_vector(n):
+    inferior.std_vector("x", inferior.basic("double"), np.arange(n, dtype="f8"))
+    return "x", n
+
+
+def setup_vector_strided(n):
+    inferior.std_vector("x", inferior.basic("double"), np.arange(n, dtype="f8"))
+    return "x[::4]", len(range(0, n, 4))
+
+
+def setup_array(n):
+    inferior.std_array("x", inferior.basic("int"), np.arange(n, dtype="i4"))
+    return "x", n
+
+
+def setup_pointer(n):
+    inferior.c_pointer("x", inferior.basic("float"), np.arange(n, dtype="f4"))
+    return f"x[:{n}]", n
+
+
+def setup_c_array(n):
+    inferior.c_array("x", inferior.basic("short"), np.arange(n) % 1000)
+    return "x", n
+
+
+def setup_complex_double(n):
+    inferior.complex_vector("x", inferior.basic("double"), np.arange(n) + 1j)
+    return "x", n
+
+
+def setup_complex_float(n):
+    inferior.complex_vector("x", inferior.basic("float"), np.arange(n) + 1j)
+    return "x", n
+
+
+def setup_vector_bool(n):
+    inferior.vector_bool("x", np.arange(n) % 3 == 0)
+    return "x", n
+
+
+def setup_nested(n):
+    # std::vector<std::array<int*, 10>>, with 10 ints behind each pointer
+    outer = max(1, n // 100)
+    values = np.arange(outer * 100).reshape(outer, 10, 10)
+    inferior.nested_vector_of_arrays("x", inferior.basic("int"), values)
+    return "x[:,:,:10]", values.size
+
+
+def setup_vector_of_vectors(n):
+    rows = max(1, n // 1000)
+    values = np.arange(rows * 1000, dtype="f8").reshape(rows, 1000)
+    inferior.vector_of_vectors("x", inferior.basic("double"), values)
+    return "x", values.size
+
+
+def setup_vector_of_arrays(n):
+    # std::vector<std::array<double, 3>>, as used for points
+    values = np.arange(n // 3 * 3, dtype="f8").reshape(-1, 3)
+    inferior.vector_of_arrays("x", inferior.basic("double"), values)
+    return "x", values.size
+
+
+def setup_vector_of_structs(n):
+    # std::vector<Particle>, with Particle = {double x, y, z; float mass; int id;}
+    values = np.zeros(n, dtype={"names": ["x", "y", "z", "mass", "id"],
+                                "formats": ["f8", "f8", "f8", "f4", "i4"]})
+    values["x"] = np.arange(n)
+    inferior.vector_of_structs("x", values)
+    return "x", n
+
+
+def setup_deque(n):
+    inferior.deque("x", inferior.basic("double"), np.arange(n, dtype="f8"))
+    return "x", n
+
+
+def setup_list(n):
+    inferior.std_list("x", inferior.basic("double"), np.arange(n, dtype="f8"))
+    return "x", n
+
+
+def setup_forward_list(n):
+    inferior.forward_list("x", inferior.basic("int"), np.arange(n, dtype="i4"))
+    return "x", n
+
+
+def setup_map(n):
+    keys = np.random.RandomState(0).permutation(n)
+    inferior.std_map("x", inferior.basic("int"), inferior.basic("double"), keys, keys * 0.5)
+    return "x", n
+
+
+def setup_unordered_map(n):
+    keys = np.arange(n)
+    inferior.unordered_map("x", inferior.basic("int"), inferior.basic("double"), keys, keys * 0.5)
+    return "x", n
+
+
+def setup_eigen_matrix(n):
+    # A column-major Eigen::MatrixXd, with 1000 rows and at least 2 columns,
+    # so that its order can be checked
+    cols = max(2, n // 1000)
+    values = np.arange(1000 * cols, dtype="f8").reshape(1000, cols)
+    inferior.eigen_matrix("x", inferior.basic("double"), values)
+    return "x", values.size
+
+
+def setup_eigen_matrix_sliced(n):
+    cols = max(2, n // 1000)
+    values = np.arange(1000 * cols, dtype="f8").reshape(1000, cols)
+    inferior.eigen_matrix("x", inferior.basic("double"), values)
+    return "x[0:100,::2]", 100 * len(range(0, cols, 2))
+
+
+def setup_vector_of_vector3d(n):
+    # std::vector<Eigen::Vector3d>
+    element = inferior.eigen_matrix_type(inferior.basic("double"), 3, 1)
+    values = np.arange(n // 3 * 3, dtype="f8").reshape(-1, 3)
+    value = inferior.variable("x", inferior.vector_type(element))
+    inferior.vector_at(value._address, element, inferior.alloc_array(values), len(values))
+    return "x", values.size
+
+
+CASES = {
+    "vector": setup_vector,
+    "vector_strided": setup_vector_strided,
+    "array": setup_array,
+    "pointer": setup_pointer,
+    "c_array": setup_c_array,
+    "complex_double": setup_complex_double,
+    "complex_float": setup_complex_float,
+    "vector_bool": setup_vector_bool,
+    "nested": setup_nested,
+    "vector_of_vectors": setup_vector_of_vectors,
+    "vector_of_arrays": setup_vector_of_arrays,
+    "vector_of_structs": setup_vector_of_structs,
+    "deque": setup_deque,
+    "list": setup_list,
+    "forward_list": setup_forward_list,
+    "map": setup_map,
+    "unordered_map": setup_unordered_map,
+    "eigen_matrix": setup_eigen_matrix,
+    "eigen_matrix_sliced": setup_eigen_matrix_sliced,
+    "vector_of_vector3d": setup_vector_of_vector3d,
+}
+
+
+# Properties the result of a case must have, besides its values
+CHECKS = {
+    "eigen_matrix": ("column-major matrices are extracted in Fortran order", lambda out: out.flags.f_contiguous),
+}
+
+
+def run_case(setup, size, repeat, check=None):
+    inferior.reset()
+    default.clear_cache()
+    expression, n_elements = setup(size)
+
+    times = []
+    for _ in range(repeat):
+        # Every repeat must go to the inferior, as if at a new stop
+        gdb.events.stop.fire()
+        start = time.perf_counter()
+        data_extractor.extract_var(expression)
+        times.append(time.perf_counter() - start)
+
+    gdb.events.stop.fire()
+    reads, bytes_read = gdb.memory.reads, gdb.memory.bytes_read
+    tracemalloc.start()
+    out = data_extractor.extract_var(expression)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    reads = gdb.memory.reads - reads
+    bytes_read = gdb.memory.bytes_read - bytes_read
+    if check is not None and not check[1](out):
+        sys.exit(f"{expression}: expected that {check[0]}")
+
+    best = min(times)
+    return {
+        "expression": expression,
+        "elements": n_elements,
+        "seconds": best,
+        "elements_per_second": n_elements / best if best > 0 else float("inf"),
+        "peak_bytes": peak,
+        "result_bytes": out.nbytes,
+        "memory_reads": reads,
+        "bytes_read": bytes_read,
+    }
+
+
+def compare(results, previous):
+    print()
+    print(f"{'case':<20} {'size':>10} {'before':>14} {'after':>14} {'speedup':>8}")
+    for key, result in results.items():
+        if key not in previous:
+            continue
+        before = previous[key]["elements_per_second"]
+        after = result["elements_per_second"]
+        case, size = key.rsplit("/", 1)
+        print(f"{case:<20} {size:>10} {before:>14.0f} {after:>14.0f} {after / before:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gdbplotlib extraction against a fake gdb")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES))
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Simulated round trip time of every memory read, in milliseconds")
+    parser.add_argument("--elementwise", action="store_true",
+                        help="Extract deque, list and map elements one gdb.Value at a time, as a baseline")
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    parser.add_argument("--compare", help="Compare against the results in this JSON file")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    gdb.memory.latency = args.latency / 1000
+    if args.elementwise:
+        # Node containers then fall back to the generic, per-element extract
+        std_types.NodeContainer.extract_into = TypeHandler.extract_into
+    results = {}
+
+    print(f"{'case':<20} {'size':>10} {'elements/s':>14} {'peak MiB':>10} {'result MiB':>10} {'reads':>8}")
+    for case in args.cases.split(","):
+        for size in sizes:
+            result = run_case(CASES[case], size, args.repeat, CHECKS.get(case))
+            results[f"{case}/{size}"] = result
+            print(f"{case:<20} {size:>10} {result['elements_per_second']:>14.0f} "
+                  f"{result['peak_bytes'] / 2**20:>10.2f} {result['result_bytes'] / 2**20:>10.2f} "
+                  f"{result['memory_reads']:>8}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results,
+            }, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file)["results"])
+
+
+if __name__ == "__main__":
+    main()
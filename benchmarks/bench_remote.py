@@ -0,0 +1,115 @@
+"""
+Benchmark of variable extraction over a remote target.
+
+Compiles remote_target.cpp, serves it with gdbserver on the loopback
+interface, and runs a batch GDB session that connects with `target remote`,
+stops at the end of main and saves each variable with every given
+`gdbplotlib-page-size`. The time and number of memory reads of each save,
+as recorded by gdbplotlib-stats, are reported. gdb, gdbserver and a C++
+compiler must be on PATH, and the GDB's Python must be able to import
+gdbplotlib and NumPy.
+
+Usage:
+    python benchmarks/bench_remote.py [--size 100000] [--page-sizes 0,4096,65536]
+                                      [--variables vector,nested] [--port 2345]
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.join(HERE, "remote_target.cpp")
+VARIABLES = ["vector", "complex_vector", "vector_bool", "nested[:,:,:10]", "vector_of_vectors"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def breakpoint_line() -> int:
+    with open(SOURCE) as file:
+        for number, line in enumerate(file, 1):
+            if "break here" in line:
+                return number
+    raise RuntimeError("No breakpoint marker in remote_target.cpp")
+
+
+def gdb_script(port: int, variables, page_sizes, directory: str) -> str:
+    lines = [
+        "set confirm off",
+        "set pagination off",
+        f"target remote 127.0.0.1:{port}",
+        f"python import sys; sys.path.insert(0, {os.path.dirname(HERE)!r})",
+        "python import gdbplotlib",
+        f"break remote_target.cpp:{breakpoint_line()}",
+        "continue",
+        "set gdbplotlib-cache-size 0",
+        "gdbplotlib-stats on",
+    ]
+    for page_size in page_sizes:
+        for i, variable in enumerate(variables):
+            result = os.path.join(directory, f"{page_size}_{i}.json")
+            lines += [
+                f"set gdbplotlib-page-size {page_size}",
+                "gdbplotlib-stats reset",
+                f"save {os.devnull} {variable}",
+                f"gdbplotlib-stats json {result}",
+            ]
+    lines.append("kill")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gdbplotlib extraction over gdbserver")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--page-sizes", default="0,4096,65536")
+    parser.add_argument("--variables", default=",".join(VARIABLES))
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+
+    for tool in ("gdb", "gdbserver", "g++"):
+        if shutil.which(tool) is None:
+            sys.exit(f"{tool} not found on PATH")
+
+    page_sizes = [int(s) for s in args.page_sizes.split(",")]
+    variables = args.variables.split(",")
+    port = args.port or free_port()
+
+    with tempfile.TemporaryDirectory() as directory:
+        program = os.path.join(directory, "remote_target")
+        subprocess.run(["g++", "-g", "-O0", "-o", program, SOURCE], check=True)
+
+        server = subprocess.Popen(["gdbserver", f"127.0.0.1:{port}", program, str(args.size)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            time.sleep(0.5)
+            script = os.path.join(directory, "bench.gdb")
+            with open(script, "w") as file:
+                file.write(gdb_script(port, variables, page_sizes, directory))
+            subprocess.run(["gdb", "-nx", "-batch", "-x", script, program], check=True,
+                           stdout=subprocess.DEVNULL)
+        finally:
+            server.kill()
+            server.wait()
+
+        print(f"{'variable':<20} {'page size':>10} {'seconds':>10} {'reads':>8} {'MiB read':>10}")
+        for page_size in page_sizes:
+            for i, variable in enumerate(variables):
+                with open(os.path.join(directory, f"{page_size}_{i}.json")) as file:
+                    result = json.load(file)
+                seconds = result["timers"].get("save", 0.0)
+                reads = result["counters"].get("read_memory", 0)
+                mib = result["counters"].get("bytes_read", 0) / 2**20
+                print(f"{variable:<20} {page_size:>10} {seconds:>10.3f} {reads:>8} {mib:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark of the time taken to import gdbplotlib, as GDB does at startup.
+
+Imports the package against the fake gdb module in fresh interpreters, and
+reports the median time of the import, including NumPy, and of the package
+alone. Exits with an error if the median time is over budget, or if any of
+the modules that should only be imported on first use (Matplotlib, SciPy,
+h5py) was imported.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--budget 400] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must not be imported until a command needs them
+DEFERRED_MODULES = ("matplotlib", "mpl_toolkits", "scipy", "h5py")
+
+CHILD = """
+import json, sys, time
+sys.path[:0] = {paths!r}
+start = time.perf_counter()
+import numpy
+numpy_done = time.perf_counter()
+import gdbplotlib
+done = time.perf_counter()
+loaded = sorted({{m.split(".")[0] for m in sys.modules}}.intersection({deferred!r}))
+print(json.dumps({{"total": done - start, "package": done - numpy_done, "deferred": loaded}}))
+"""
+
+
+def measure() -> dict:
+    code = CHILD.format(paths=[os.path.join(HERE, "fake_gdb"), os.path.dirname(HERE)], deferred=DEFERRED_MODULES)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import time of gdbplotlib against a fake gdb")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=400.0,
+                        help="Maximum median import time in milliseconds, including NumPy")
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.repeat)]
+    total = 1000 * statistics.median(r["total"] for r in runs)
+    package = 1000 * statistics.median(r["package"] for r in runs)
+    deferred = sorted(set().union(*(r["deferred"] for r in runs)))
+
+    print(f"import gdbplotlib: {total:.1f} ms ({package:.1f} ms without NumPy), budget {args.budget:.0f} ms")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"total_ms": total, "package_ms": package, "budget_ms": args.budget, "deferred": deferred},
+                      file, indent=2)
+
+    if deferred:
+        sys.exit(f"Imported at startup: {', '.join(deferred)}")
+    if total > args.budget:
+        sys.exit(f"Import time of {total:.1f} ms is over the budget of {args.budget:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,670 @@
+"""
+Stand-in for the GDB Python API, backed by a bytearray instead of a live
+inferior
+"""
+import struct
+import time
+
+TYPE_CODE_PTR = 1
+TYPE_CODE_ARRAY = 2
+TYPE_CODE_STRUCT = 3
+TYPE_CODE_UNION = 4
+TYPE_CODE_ENUM = 5
+TYPE_CODE_FLAGS = 6
+TYPE_CODE_FUNC = 7
+TYPE_CODE_INT = 8
+TYPE_CODE_FLT = 9
+TYPE_CODE_VOID = 10
+TYPE_CODE_RANGE = 12
+TYPE_CODE_STRING = 13
+TYPE_CODE_ERROR = 15
+TYPE_CODE_METHOD = 16
+TYPE_CODE_REF = 19
+TYPE_CODE_RVALUE_REF = 20
+TYPE_CODE_CHAR = 21
+TYPE_CODE_BOOL = 22
+TYPE_CODE_COMPLEX = 23
+TYPE_CODE_TYPEDEF = 24
+
+COMMAND_NONE = -1
+COMMAND_RUNNING = 0
+COMMAND_DATA = 1
+COMMAND_STACK = 2
+COMMAND_FILES = 3
+COMMAND_SUPPORT = 4
+COMMAND_STATUS = 5
+COMMAND_BREAKPOINTS = 6
+COMMAND_TRACEPOINTS = 7
+COMMAND_OBSCURE = 8
+COMMAND_MAINTENANCE = 9
+COMMAND_USER = 13
+
+COMPLETE_NONE = 0
+COMPLETE_FILENAME = 1
+COMPLETE_LOCATION = 2
+COMPLETE_COMMAND = 3
+COMPLETE_SYMBOL = 4
+COMPLETE_EXPRESSION = 5
+
+PARAM_BOOLEAN = 0
+PARAM_AUTO_BOOLEAN = 1
+PARAM_UINTEGER = 2
+PARAM_INTEGER = 3
+PARAM_STRING = 4
+PARAM_STRING_NOESCAPE = 5
+PARAM_OPTIONAL_FILENAME = 6
+PARAM_FILENAME = 7
+PARAM_ZINTEGER = 8
+PARAM_ZUINTEGER = 9
+PARAM_ZUINTEGER_UNLIMITED = 10
+PARAM_ENUM = 11
+
+STDOUT = 0
+STDERR = 1
+
+
+class error(RuntimeError):
+    pass
+
+
+class MemoryError(error):
+    pass
+
+
+class GdbError(Exception):
+    pass
+
+
+# --------------------------------------------------------------------------
+# Inferior memory
+# --------------------------------------------------------------------------
+
+class Memory:
+    BASE = 0x1000
+    PAGE = 4096
+
+    def __init__(self):
+        self.data = bytearray()
+        self.top = 0
+        self.reads = 0
+        self.bytes_read = 0
+        # Simulated round trip time of every read, in seconds, as over a
+        # connection to a remote target
+        self.latency = 0.0
+
+    def alloc(self, size: int, align: int = 16) -> int:
+        offset = -(-self.top // align) * align
+        self.top = offset + max(size, 1)
+        if self.top > len(self.data):
+            # Like a real heap, memory is mapped in whole pages
+            self.data.extend(bytes(-(-self.top // self.PAGE) * self.PAGE - len(self.data)))
+        return self.BASE + offset
+
+    def _offset(self, address: int, length: int) -> int:
+        offset = address - self.BASE
+        if offset < 0 or offset + length > len(self.data):
+            raise MemoryError(f"Cannot access memory at address {hex(address)}")
+        return offset
+
+    def read(self, address: int, length: int) -> memoryview:
+        offset = self._offset(address, length)
+        self.reads += 1
+        self.bytes_read += length
+        if self.latency:
+            time.sleep(self.latency)
+        # Like gdb.Membuf, the returned buffer is a copy of inferior memory
+        return memoryview(bytes(self.data[offset:offset + length]))
+
+    def write(self, address: int, data: bytes):
+        offset = self._offset(address, len(data))
+        self.data[offset:offset + len(data)] = data
+
+    def reset(self):
+        self.data = bytearray()
+        self.top = 0
+        self.reads = 0
+        self.bytes_read = 0
+
+
+memory = Memory()
+
+
+class Inferior:
+    num = 1
+    pid = 1
+
+    def read_memory(self, address, length):
+        return memory.read(int(address), int(length))
+
+    def write_memory(self, address, buffer, length=None):
+        data = bytes(buffer) if length is None else bytes(buffer)[:length]
+        memory.write(int(address), data)
+        events.memory_changed.fire(MemoryChangedEvent(address, len(data)))
+
+    def threads(self):
+        return ()
+
+
+_inferior = Inferior()
+
+
+def selected_inferior():
+    return _inferior
+
+
+def inferiors():
+    return (_inferior,)
+
+
+# --------------------------------------------------------------------------
+# Types
+# --------------------------------------------------------------------------
+
+class Field:
+    def __init__(self, name, type, bitpos=0, bitsize=0, is_base_class=False):
+        self.name = name
+        self.type = type
+        self.bitpos = bitpos
+        self.bitsize = bitsize
+        self.is_base_class = is_base_class
+        self.artificial = False
+
+
+class Type:
+    def __init__(self, name, code, sizeof, target=None, fields=(), template_args=(),
+                 length=None, is_signed=None, alignof=None):
+        self.name = name
+        self.code = code
+        self.sizeof = sizeof
+        self._target = target
+        self._fields = list(fields)
+        self._template_args = list(template_args)
+        self._length = length
+        self.is_signed = is_signed if is_signed is not None else not name.startswith("unsigned")
+        self.alignof = alignof if alignof is not None else min(sizeof, 16) or 1
+        self.tag = name if code == TYPE_CODE_STRUCT else None
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"Type({self.name})"
+
+    def fields(self):
+        if self.code not in (TYPE_CODE_STRUCT, TYPE_CODE_UNION, TYPE_CODE_ARRAY):
+            raise TypeError("Type is not a structure, union, enum, or function type.")
+        return list(self._fields)
+
+    def keys(self):
+        return [f.name for f in self._fields]
+
+    def __getitem__(self, name):
+        for f in self._fields:
+            if f.name == name:
+                return f
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        return any(f.name == name for f in self._fields)
+
+    def target(self):
+        if self._target is None:
+            raise RuntimeError("Type does not have a target.")
+        return self._target
+
+    def template_argument(self, n):
+        try:
+            return self._template_args[n]
+        except IndexError:
+            raise RuntimeError(f"Template argument number {n} out of range.")
+
+    def range(self):
+        if self.code != TYPE_CODE_ARRAY:
+            raise RuntimeError("This type does not have a range.")
+        return (0, self._length - 1)
+
+    def strip_typedefs(self):
+        t = self
+        while t.code == TYPE_CODE_TYPEDEF:
+            t = t._target
+        return t
+
+    def unqualified(self):
+        return self
+
+    def pointer(self):
+        return pointer(self)
+
+    def array(self, n1, n2=None):
+        length = n1 + 1 if n2 is None else n2 - n1 + 1
+        return array(self, length)
+
+    def __eq__(self, other):
+        return isinstance(other, Type) and self.name == other.name and self.code == other.code
+
+    def __hash__(self):
+        return hash((self.name, self.code))
+
+
+_type_registry = {}
+
+
+def register_type(t: Type) -> Type:
+    _type_registry[t.name] = t
+    return t
+
+
+def lookup_type(name, block=None):
+    try:
+        return _type_registry[name]
+    except KeyError:
+        raise error(f"No type named {name}.")
+
+
+def pointer(target: Type) -> Type:
+    return Type(f"{target.name} *", TYPE_CODE_PTR, 8, target=target, is_signed=False)
+
+
+def array(target: Type, length: int) -> Type:
+    return Type(f"{target.name} [{length}]", TYPE_CODE_ARRAY, target.sizeof * length,
+                target=target, length=length, alignof=target.alignof)
+
+
+_INT_FORMATS = {(1, True): "b", (1, False): "B", (2, True): "h", (2, False): "H",
+                (4, True): "i", (4, False): "I", (8, True): "q", (8, False): "Q"}
+_FLT_FORMATS = {4: "f", 8: "d"}
+
+
+def _format(t: Type) -> str:
+    if t.code == TYPE_CODE_FLT:
+        return "<" + _FLT_FORMATS[t.sizeof]
+    if t.code == TYPE_CODE_PTR:
+        return "<Q"
+    if t.code == TYPE_CODE_BOOL:
+        return "<?"
+    return "<" + _INT_FORMATS[(t.sizeof, t.is_signed)]
+
+
+# --------------------------------------------------------------------------
+# Values
+# --------------------------------------------------------------------------
+
+class Value:
+    def __init__(self, val, type=None, address=None):
+        if isinstance(val, Value):
+            type, address, val = val.type, val._address, val._val
+        elif type is None:
+            if isinstance(val, bool):
+                type = _basic["bool"]
+            elif isinstance(val, int):
+                type = _basic["long"]
+            elif isinstance(val, float):
+                type = _basic["double"]
+            else:
+                raise TypeError(f"Could not convert Python object: {val!r}.")
+        elif isinstance(val, (bytes, bytearray, memoryview)):
+            val = bytes(val)
+        self.type = type
+        self._address = address
+        self._val = val
+
+    @classmethod
+    def at(cls, type: Type, address: int) -> "Value":
+        return cls(None, type, address)
+
+    @property
+    def address(self):
+        if self._address is None:
+            return None
+        return Value(self._address, pointer(self.type))
+
+    @property
+    def is_lazy(self):
+        return False
+
+    def _raw(self) -> bytes:
+        if self._address is not None:
+            return bytes(memory.read(self._address, self.type.sizeof))
+        if isinstance(self._val, bytes):
+            return self._val
+        return struct.pack(_format(self._basic_type()), self._val)
+
+    def _basic_type(self) -> Type:
+        return self.type.strip_typedefs()
+
+    def _scalar(self):
+        if self._address is None and not isinstance(self._val, bytes):
+            return self._val
+        t = self._basic_type()
+        if t.code == TYPE_CODE_COMPLEX:
+            part = t.target()
+            raw = self._raw()
+            return complex(*struct.unpack("<" + _FLT_FORMATS[part.sizeof] * 2, raw))
+        if t.code in (TYPE_CODE_STRUCT, TYPE_CODE_ARRAY, TYPE_CODE_UNION):
+            raise error("Cannot convert value to long.")
+        return struct.unpack(_format(t), self._raw())[0]
+
+    def __getitem__(self, key):
+        t = self._basic_type()
+        if isinstance(key, Field):
+            key = key.name
+        if isinstance(key, str):
+            if t.code not in (TYPE_CODE_STRUCT, TYPE_CODE_UNION):
+                raise error("Attempt to extract a component of a value that is not a structure.")
+            for f in t.fields():
+                if f.name == key and f.bitsize:
+                    return self._bitfield(f)
+                if f.name == key:
+                    return Value.at(f.type, self._address + f.bitpos // 8)
+            for f in t.fields():
+                if f.is_base_class:
+                    try:
+                        return Value.at(f.type, self._address + f.bitpos // 8)[key]
+                    except error:
+                        pass
+            raise error(f"There is no member named {key}.")
+        key = int(key)
+        if t.code == TYPE_CODE_PTR:
+            target = t.target()
+            return Value.at(target, int(self) + key * target.sizeof)
+        if t.code == TYPE_CODE_ARRAY:
+            target = t.target()
+            return Value.at(target, self._address + key * target.sizeof)
+        raise error("Cannot subscript requested type.")
+
+    def _bitfield(self, f: Field) -> "Value":
+        first, last = f.bitpos // 8, (f.bitpos + f.bitsize - 1) // 8
+        raw = int.from_bytes(memory.read(self._address + first, last - first + 1), "little")
+        value = (raw >> (f.bitpos % 8)) & ((1 << f.bitsize) - 1)
+        if f.type.strip_typedefs().is_signed and value >> (f.bitsize - 1):
+            value -= 1 << f.bitsize
+        return Value(value, f.type)
+
+    def dereference(self):
+        t = self._basic_type()
+        if t.code != TYPE_CODE_PTR:
+            raise error("Attempt to take contents of a non-pointer value.")
+        return Value.at(t.target(), int(self))
+
+    def referenced_value(self):
+        return self.dereference()
+
+    def cast(self, type):
+        if self._address is not None:
+            return Value.at(type, self._address)
+        return Value(self._val, type)
+
+    def reinterpret_cast(self, type):
+        return self.cast(type)
+
+    def fetch_lazy(self):
+        pass
+
+    def __int__(self):
+        return int(self._scalar())
+
+    def __index__(self):
+        return int(self)
+
+    def __float__(self):
+        return float(self._scalar())
+
+    def __complex__(self):
+        return complex(self._scalar())
+
+    def __bool__(self):
+        return bool(self._scalar())
+
+    def _binop_int(self, other, sign):
+        t = self._basic_type()
+        if t.code == TYPE_CODE_PTR:
+            if isinstance(other, Value) and other._basic_type().code == TYPE_CODE_PTR:
+                return Value((int(self) - int(other)) // t.target().sizeof)
+            return Value(int(self) + sign * int(other) * t.target().sizeof, t)
+        return Value(self._scalar() + sign * _py(other))
+
+    def __add__(self, other):
+        return self._binop_int(other, 1)
+
+    def __sub__(self, other):
+        return self._binop_int(other, -1)
+
+    def __mul__(self, other):
+        return Value(self._scalar() * _py(other))
+
+    def __eq__(self, other):
+        return self._scalar() == _py(other)
+
+    def __lt__(self, other):
+        return self._scalar() < _py(other)
+
+    def __hash__(self):
+        return id(self)
+
+    def __str__(self):
+        t = self._basic_type()
+        if t.code == TYPE_CODE_COMPLEX:
+            c = self._scalar()
+            return f"{c.real:g} + {c.imag:g}i"
+        if t.code == TYPE_CODE_PTR:
+            return hex(int(self))
+        if t.code in (TYPE_CODE_STRUCT, TYPE_CODE_ARRAY):
+            return "{...}"
+        return str(self._scalar())
+
+    def __repr__(self):
+        return f"<gdb.Value {self.type}>"
+
+
+def _py(value):
+    return value._scalar() if isinstance(value, Value) else value
+
+
+_basic = {}
+for _name, _code, _size in [
+    ("char", TYPE_CODE_INT, 1), ("signed char", TYPE_CODE_INT, 1), ("unsigned char", TYPE_CODE_INT, 1),
+    ("short", TYPE_CODE_INT, 2), ("unsigned short", TYPE_CODE_INT, 2),
+    ("int", TYPE_CODE_INT, 4), ("unsigned int", TYPE_CODE_INT, 4),
+    ("long", TYPE_CODE_INT, 8), ("unsigned long", TYPE_CODE_INT, 8),
+    ("long long", TYPE_CODE_INT, 8), ("unsigned long long", TYPE_CODE_INT, 8),
+    ("float", TYPE_CODE_FLT, 4), ("double", TYPE_CODE_FLT, 8),
+    ("bool", TYPE_CODE_BOOL, 1), ("void", TYPE_CODE_VOID, 1),
+]:
+    _basic[_name] = register_type(Type(_name, _code, _size))
+
+
+# --------------------------------------------------------------------------
+# Expressions
+# --------------------------------------------------------------------------
+
+symbols = {}
+
+
+def parse_and_eval(expression, global_context=False):
+    expression = expression.strip()
+    try:
+        return Value(int(expression, 0))
+    except ValueError:
+        pass
+
+    name, *members = expression.split(".")
+    if name not in symbols:
+        raise error(f"No symbol \"{name}\" in current context.")
+    value = symbols[name]
+    for member in members:
+        value = value[member]
+    return value
+
+
+def lookup_symbol(name, block=None, domain=None):
+    return None, False
+
+
+# --------------------------------------------------------------------------
+# Commands, parameters and events
+# --------------------------------------------------------------------------
+
+commands = {}
+parameters = {}
+
+
+class Command:
+    def __init__(self, name, command_class, completer_class=COMPLETE_NONE, prefix=False):
+        self._name = name
+        commands[name] = self
+
+    def dont_repeat(self):
+        pass
+
+    def invoke(self, argument, from_tty):
+        raise GdbError("Command is not implemented.")
+
+
+class Parameter:
+    def __init__(self, name, command_class, parameter_class, enum_sequence=None):
+        self._name = name
+        self._class = parameter_class
+        self._enum = enum_sequence
+        self.value = None
+        parameters[name] = self
+
+    def _set(self, string):
+        if self._class == PARAM_BOOLEAN:
+            if string not in ("on", "off", "1", "0", "yes", "no", "enable", "disable"):
+                raise error(f"\"on\" or \"off\" expected.")
+            self.value = string in ("on", "1", "yes", "enable")
+        elif self._class in (PARAM_UINTEGER, PARAM_INTEGER, PARAM_ZINTEGER, PARAM_ZUINTEGER,
+                             PARAM_ZUINTEGER_UNLIMITED):
+            self.value = int(string, 0)
+        elif self._class == PARAM_ENUM:
+            if string not in self._enum:
+                raise error(f"Undefined item: \"{string}\".")
+            self.value = string
+        else:
+            self.value = string
+        if hasattr(self, "get_set_string"):
+            message = self.get_set_string()
+            if message:
+                write(message + "\n")
+
+
+def parameter(name):
+    return parameters[name].value
+
+
+def execute(command, from_tty=False, to_string=False):
+    words = command.split()
+    for n in range(len(words), 0, -1):
+        name = " ".join(words[:n])
+        if name in commands:
+            argument = command.split(None, n)[n] if len(words) > n else ""
+            commands[name].invoke(argument, from_tty)
+            return "" if to_string else None
+    if words[:1] == ["set"] and len(words) >= 3:
+        for n in range(len(words) - 1, 1, -1):
+            name = " ".join(words[1:n])
+            if name in parameters:
+                parameters[name]._set(" ".join(words[n:]))
+                return "" if to_string else None
+    raise error(f"Undefined command: \"{command}\".")
+
+
+def write(string, stream=STDOUT):
+    print(string, end="")
+
+
+def flush(stream=STDOUT):
+    pass
+
+
+class EventRegistry:
+    def __init__(self):
+        self._handlers = []
+
+    def connect(self, handler):
+        self._handlers.append(handler)
+
+    def disconnect(self, handler):
+        self._handlers.remove(handler)
+
+    def fire(self, event=None):
+        for handler in list(self._handlers):
+            handler(event)
+
+
+class _Events:
+    def __init__(self):
+        for name in ("stop", "cont", "exited", "new_objfile", "clear_objfiles",
+                     "inferior_call", "memory_changed", "register_changed",
+                     "breakpoint_created", "breakpoint_modified", "breakpoint_deleted",
+                     "before_prompt", "new_inferior", "inferior_deleted", "new_thread"):
+            setattr(self, name, EventRegistry())
+
+
+events = _Events()
+
+
+class StopEvent:
+    pass
+
+
+class MemoryChangedEvent:
+    def __init__(self, address, length):
+        self.address = address
+        self.length = length
+
+
+class BreakpointEvent(StopEvent):
+    def __init__(self, breakpoints):
+        self.breakpoints = breakpoints
+        self.breakpoint = breakpoints[0]
+
+
+class Breakpoint:
+    def __init__(self, spec, number=1):
+        self.location = spec
+        self.number = number
+        self.hit_count = 0
+        self.enabled = True
+
+
+def breakpoints():
+    return ()
+
+
+class Architecture:
+    def name(self):
+        return "i386:x86-64"
+
+
+class Frame:
+    def __init__(self, level=0):
+        self._level = level
+
+    def architecture(self):
+        return Architecture()
+
+    def level(self):
+        return self._level
+
+
+_selected_frame = Frame()
+
+
+def selected_frame():
+    return _selected_frame
+
+
+class InferiorThread:
+    num = 1
+    global_num = 1
+
+
+_selected_thread = InferiorThread()
+
+
+def selected_thread():
+    return _selected_thread
+
+
+VERSION = "13.1-fake"
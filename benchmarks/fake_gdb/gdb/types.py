@@ -0,0 +1,15 @@
+import gdb
+
+
+def get_basic_type(type_):
+    while type_.code in (gdb.TYPE_CODE_REF, gdb.TYPE_CODE_RVALUE_REF, gdb.TYPE_CODE_TYPEDEF):
+        if type_.code == gdb.TYPE_CODE_TYPEDEF:
+            type_ = type_.strip_typedefs()
+        else:
+            type_ = type_.target()
+    return type_.unqualified()
+
+
+def has_field(type_, field):
+    type_ = get_basic_type(type_)
+    return any(f.name == field for f in type_.fields())
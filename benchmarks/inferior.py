@@ -0,0 +1,455 @@
+"""
+Helpers that lay out C++ objects in the fake inferior's memory, following the
+libstdc++ representation that gdbplotlib's handlers expect
+"""
+import numpy as np
+
+import gdb
+
+T = gdb._basic
+
+_DTYPES = {
+    "char": "i1", "signed char": "i1", "unsigned char": "u1", "short": "i2", "unsigned short": "u2",
+    "int": "i4", "unsigned int": "u4", "long": "i8", "unsigned long": "u8", "long long": "i8",
+    "unsigned long long": "u8", "float": "f4", "double": "f8", "bool": "?",
+}
+
+
+def reset():
+    gdb.memory.reset()
+    gdb.symbols.clear()
+
+
+def basic(name: str) -> gdb.Type:
+    return T[name]
+
+
+def struct(name: str, members, template_args=()) -> gdb.Type:
+    fields = []
+    offset = 0
+    align = 1
+    for member_name, member_type in members:
+        offset = -(-offset // member_type.alignof) * member_type.alignof
+        fields.append(gdb.Field(member_name, member_type, bitpos=8 * offset))
+        offset += member_type.sizeof
+        align = max(align, member_type.alignof)
+    size = -(-offset // align) * align
+    return gdb.register_type(gdb.Type(name, gdb.TYPE_CODE_STRUCT, size, fields=fields,
+                                      template_args=template_args, alignof=align))
+
+
+def typedef(name: str, target: gdb.Type) -> gdb.Type:
+    return gdb.Type(name, gdb.TYPE_CODE_TYPEDEF, target.sizeof, target=target)
+
+
+def complex_type(part: gdb.Type) -> gdb.Type:
+    inner = gdb.Type(f"_Complex {part.name}", gdb.TYPE_CODE_COMPLEX, 2 * part.sizeof,
+                     target=part, alignof=part.alignof)
+    return struct(f"std::complex<{part.name}>", [("_M_value", inner)], template_args=(part,))
+
+
+def write(address: int, data: np.ndarray):
+    gdb.memory.write(address, np.ascontiguousarray(data).tobytes())
+
+
+def write_pointer(address: int, target: int):
+    write(address, np.array([target], "u8"))
+
+
+def alloc_array(values: np.ndarray) -> int:
+    address = gdb.memory.alloc(max(values.nbytes, 1))
+    write(address, values)
+    return address
+
+
+def variable(name: str, gdb_type: gdb.Type, address: int = None) -> gdb.Value:
+    if address is None:
+        address = gdb.memory.alloc(gdb_type.sizeof, gdb_type.alignof)
+    value = gdb.Value.at(gdb_type, address)
+    if name is not None:
+        gdb.symbols[name] = value
+    return value
+
+
+def vector_type(element: gdb.Type) -> gdb.Type:
+    name = f"std::vector<{element.name}, std::allocator<{element.name}> >"
+    if name in gdb._type_registry:
+        return gdb._type_registry[name]
+    ptr = gdb.pointer(element)
+    impl = struct(f"std::_Vector_base<{element.name}>::_Vector_impl",
+                  [("_M_start", ptr), ("_M_finish", ptr), ("_M_end_of_storage", ptr)])
+    return struct(name, [("_M_impl", impl)], template_args=(element,))
+
+
+def vector_at(address: int, element: gdb.Type, data_address: int, size: int, capacity: int = None):
+    capacity = size if capacity is None else capacity
+    write(address, np.array([data_address, data_address + size * element.sizeof,
+                             data_address + capacity * element.sizeof], "u8"))
+
+
+def std_vector(name, element: gdb.Type, values) -> gdb.Value:
+    values = np.asarray(values, _DTYPES.get(element.name))
+    t = vector_type(element)
+    value = variable(name, t)
+    vector_at(value._address, element, alloc_array(values), len(values))
+    return value
+
+
+def array_type(element: gdb.Type, size: int) -> gdb.Type:
+    name = f"std::array<{element.name}, {size}>"
+    if name in gdb._type_registry:
+        return gdb._type_registry[name]
+    return struct(name, [("_M_elems", gdb.array(element, size))], template_args=(element, size))
+
+
+def std_array(name, element: gdb.Type, values) -> gdb.Value:
+    values = np.asarray(values, _DTYPES.get(element.name))
+    value = variable(name, array_type(element, len(values)))
+    write(value._address, values)
+    return value
+
+
+def c_array(name, element: gdb.Type, values) -> gdb.Value:
+    values = np.asarray(values, _DTYPES.get(element.name))
+    value = variable(name, gdb.array(element, len(values)))
+    write(value._address, values)
+    return value
+
+
+def c_pointer(name, element: gdb.Type, values) -> gdb.Value:
+    values = np.asarray(values, _DTYPES.get(element.name))
+    value = variable(name, gdb.pointer(element))
+    write_pointer(value._address, alloc_array(values))
+    return value
+
+
+def complex_vector(name, part: gdb.Type, values) -> gdb.Value:
+    element = complex_type(part)
+    values = np.asarray(values, "c16" if part.sizeof == 8 else "c8")
+    value = variable(name, vector_type(element))
+    vector_at(value._address, element, alloc_array(values), len(values))
+    return value
+
+
+def vector_bool(name, values) -> gdb.Value:
+    values = np.asarray(values, bool)
+    word = basic("unsigned long")
+    word_ptr = gdb.pointer(word)
+    iterator = struct("std::_Bit_iterator", [("_M_p", word_ptr), ("_M_offset", basic("unsigned int"))])
+    impl = struct("std::_Bvector_base<std::allocator<bool> >::_Bvector_impl",
+                  [("_M_start", iterator), ("_M_finish", iterator), ("_M_end_of_storage", word_ptr)])
+    t = struct("std::vector<bool, std::allocator<bool> >", [("_M_impl", impl)],
+               template_args=(basic("bool"),))
+    value = variable(name, t)
+
+    n_words = -(-len(values) // 64)
+    packed = np.packbits(np.concatenate([values, np.zeros(n_words * 64 - len(values), bool)]),
+                         bitorder="little")
+    data = alloc_array(packed)
+    start = value._address
+    finish = start + iterator.sizeof
+    write(start, np.array([data, 0], "u8"))
+    write(finish, np.array([data + 8 * (len(values) // 64), len(values) % 64], "u8"))
+    write_pointer(finish + iterator.sizeof, data + 8 * n_words)
+    return value
+
+
+def nested_vector_of_arrays(name, element: gdb.Type, values: np.ndarray) -> gdb.Value:
+    """std::vector<std::array<T*, M>> where values has shape (N, M, K)"""
+    n, m, k = values.shape
+    arr = array_type(gdb.pointer(element), m)
+    pointers = np.array([[alloc_array(np.asarray(values[i, j], _DTYPES[element.name]))
+                          for j in range(m)] for i in range(n)], "u8")
+    value = variable(name, vector_type(arr))
+    vector_at(value._address, arr, alloc_array(pointers), n)
+    return value
+
+
+def vector_of_vectors(name, element: gdb.Type, values: np.ndarray) -> gdb.Value:
+    """std::vector<std::vector<T>> where values has shape (N, M)"""
+    inner = vector_type(element)
+    value = variable(name, vector_type(inner))
+    rows = gdb.memory.alloc(inner.sizeof * len(values))
+    for i, row in enumerate(values):
+        row = np.asarray(row, _DTYPES[element.name])
+        vector_at(rows + i * inner.sizeof, element, alloc_array(row), len(row))
+    vector_at(value._address, inner, rows, len(values))
+    return value
+
+
+def vector_of_arrays(name, element: gdb.Type, values: np.ndarray) -> gdb.Value:
+    """std::vector<std::array<T, M>> where values has shape (N, M)"""
+    n, m = values.shape
+    arr = array_type(element, m)
+    value = variable(name, vector_type(arr))
+    vector_at(value._address, arr, alloc_array(np.asarray(values, _DTYPES[element.name])), n)
+    return value
+
+
+def vector_of_structs(name, values: np.ndarray) -> gdb.Value:
+    """std::vector<Record> where values is a structured array of Record"""
+    members = [(field, basic({"f8": "double", "f4": "float", "i4": "int", "i8": "long"}[values.dtype[field].str[1:]]))
+               for field in values.dtype.names]
+    record = struct("Record", members)
+    value = variable(name, vector_type(record))
+    vector_at(value._address, record, alloc_array(values), len(values))
+    return value
+
+
+def _align(offset: int, alignment: int) -> int:
+    return -(-offset // alignment) * alignment
+
+
+def deque(name, element: gdb.Type, values, first_offset: int = None) -> gdb.Value:
+    """std::deque<T>, with 512-byte blocks and first_offset free slots before the first element"""
+    values = np.asarray(values, _DTYPES.get(element.name))
+    ptr = gdb.pointer(element)
+    ptr_ptr = gdb.pointer(ptr)
+    iterator = struct(f"std::_Deque_iterator<{element.name}, {element.name}&, {element.name}*>",
+                      [("_M_cur", ptr), ("_M_first", ptr), ("_M_last", ptr), ("_M_node", ptr_ptr)])
+    impl = struct(f"std::_Deque_base<{element.name}>::_Deque_impl",
+                  [("_M_map", ptr_ptr), ("_M_map_size", basic("unsigned long")),
+                   ("_M_start", iterator), ("_M_finish", iterator)])
+    t = struct(f"std::deque<{element.name}, std::allocator<{element.name}> >", [("_M_impl", impl)],
+               template_args=(element,))
+    value = variable(name, t)
+
+    size = element.sizeof
+    buffer_size = max(1, 512 // size)
+    first_offset = buffer_size // 2 if first_offset is None else first_offset
+    n_blocks = (first_offset + len(values)) // buffer_size + 1
+    padded = np.zeros(n_blocks * buffer_size, values.dtype)
+    padded[first_offset:first_offset + len(values)] = values
+    blocks = [alloc_array(padded[i * buffer_size:(i + 1) * buffer_size]) for i in range(n_blocks)]
+    table = alloc_array(np.array([0] + blocks + [0], "u8"))
+
+    end = first_offset + len(values)
+    start_node, finish_node = table + 8, table + 8 * (1 + end // buffer_size)
+    start_block, finish_block = blocks[0], blocks[end // buffer_size]
+    write(value._address, np.array([
+        table, n_blocks + 2,
+        start_block + first_offset * size, start_block, start_block + buffer_size * size, start_node,
+        finish_block + end % buffer_size * size, finish_block, finish_block + buffer_size * size, finish_node,
+    ], "u8"))
+    return value
+
+
+def _nodes(values: np.ndarray, value_offset: int, node_size: int):
+    """Allocates one node per value, next to each other, with the value at value_offset"""
+    nodes = []
+    for v in values:
+        node = gdb.memory.alloc(node_size, 16)
+        write(node + value_offset, np.asarray(v))
+        nodes.append(node)
+    return nodes
+
+
+def std_list(name, element: gdb.Type, values) -> gdb.Value:
+    values = np.asarray(values, _DTYPES.get(element.name))
+    base = struct("std::__detail::_List_node_base", [])
+    base_ptr = gdb.pointer(base)
+    base = gdb.register_type(gdb.Type(base.name, gdb.TYPE_CODE_STRUCT, 16, fields=[
+        gdb.Field("_M_next", base_ptr, 0), gdb.Field("_M_prev", base_ptr, 64)], alignof=8))
+    header = struct("std::__detail::_List_node_header",
+                    [("_M_next", base_ptr), ("_M_prev", base_ptr), ("_M_size", basic("unsigned long"))])
+    impl = struct(f"std::__cxx11::_List_base<{element.name}>::_List_impl", [("_M_node", header)])
+    t = struct(f"std::__cxx11::list<{element.name}, std::allocator<{element.name}> >", [("_M_impl", impl)],
+               template_args=(element,))
+    value = variable(name, t)
+
+    value_offset = _align(16, element.alignof)
+    nodes = _nodes(values, value_offset, value_offset + element.sizeof)
+    head = value._address
+    ring = [head] + nodes + [head]
+    for prev, node, nxt in zip(ring, ring[1:], ring[2:]):
+        write(node, np.array([nxt, prev], "u8"))
+    write(head, np.array([ring[1], ring[-2], len(values)], "u8"))
+    return value
+
+
+def forward_list(name, element: gdb.Type, values) -> gdb.Value:
+    values = np.asarray(values, _DTYPES.get(element.name))
+    base = gdb.register_type(gdb.Type("std::_Fwd_list_node_base", gdb.TYPE_CODE_STRUCT, 8, alignof=8))
+    base._fields = [gdb.Field("_M_next", gdb.pointer(base), 0)]
+    impl = struct(f"std::_Fwd_list_base<{element.name}>::_Fwd_list_impl", [("_M_head", base)])
+    t = struct(f"std::forward_list<{element.name}, std::allocator<{element.name}> >", [("_M_impl", impl)],
+               template_args=(element,))
+    value = variable(name, t)
+
+    value_offset = _align(8, element.alignof)
+    nodes = _nodes(values, value_offset, value_offset + element.sizeof)
+    for node, nxt in zip([value._address] + nodes, nodes + [0]):
+        write_pointer(node, nxt)
+    return value
+
+
+def _pair_type(key: gdb.Type, mapped: gdb.Type) -> gdb.Type:
+    return struct(f"std::pair<const {key.name}, {mapped.name}>", [("first", key), ("second", mapped)])
+
+
+def _pairs(keys, mapped_values, key: gdb.Type, mapped: gdb.Type) -> np.ndarray:
+    pair = _pair_type(key, mapped)
+    dtype = np.dtype({"names": ["first", "second"], "formats": [_DTYPES[key.name], _DTYPES[mapped.name]],
+                      "offsets": [f.bitpos // 8 for f in pair.fields()], "itemsize": pair.sizeof})
+    pairs = np.zeros(len(keys), dtype)
+    pairs["first"], pairs["second"] = keys, mapped_values
+    return pairs
+
+
+def std_map(name, key: gdb.Type, mapped: gdb.Type, keys, mapped_values) -> gdb.Value:
+    """std::map<K, T>, as a balanced red-black tree (colours are not set)"""
+    order = np.argsort(keys, kind="stable")
+    pairs = _pairs(np.asarray(keys)[order], np.asarray(mapped_values)[order], key, mapped)
+    pair = _pair_type(key, mapped)
+    allocator = struct(f"std::allocator<{pair.name}>", [], template_args=(pair,))
+
+    node_base = gdb.register_type(gdb.Type("std::_Rb_tree_node_base", gdb.TYPE_CODE_STRUCT, 32, alignof=8))
+    node_ptr = gdb.pointer(node_base)
+    node_base._fields = [gdb.Field("_M_color", basic("int"), 0), gdb.Field("_M_parent", node_ptr, 64),
+                         gdb.Field("_M_left", node_ptr, 128), gdb.Field("_M_right", node_ptr, 192)]
+    impl = struct(f"std::_Rb_tree<{key.name}>::_Rb_tree_impl",
+                  [("_M_header", node_base), ("_M_node_count", basic("unsigned long"))])
+    tree = struct(f"std::_Rb_tree<{key.name}, {pair.name}>", [("_M_impl", impl)])
+    t = struct(f"std::map<{key.name}, {mapped.name}, std::less<{key.name}>, {allocator.name} >",
+               [("_M_t", tree)], template_args=(key, mapped, basic("int"), allocator))
+    value = variable(name, t)
+    header = value._address
+
+    value_offset = _align(32, pair.alignof)
+    nodes = _nodes(pairs, value_offset, value_offset + pair.sizeof)
+    links = {}
+
+    def build(lo, hi, parent):
+        if lo >= hi:
+            return 0
+        mid = (lo + hi) // 2
+        links[nodes[mid]] = [parent, build(lo, mid, nodes[mid]), build(mid + 1, hi, nodes[mid])]
+        return nodes[mid]
+
+    root = build(0, len(nodes), header)
+    for node, (parent, left, right) in links.items():
+        write(node + 8, np.array([parent, left, right], "u8"))
+    if nodes:
+        write(header + 8, np.array([root, nodes[0], nodes[-1], len(nodes)], "u8"))
+    else:
+        write(header + 8, np.array([0, header, header, 0], "u8"))
+    return value
+
+
+def unordered_map(name, key: gdb.Type, mapped: gdb.Type, keys, mapped_values) -> gdb.Value:
+    """std::unordered_map<K, T>, whose iteration order is the order of keys"""
+    pairs = _pairs(keys, mapped_values, key, mapped)
+    pair = _pair_type(key, mapped)
+    allocator = struct(f"std::allocator<{pair.name}>", [], template_args=(pair,))
+
+    node_base = gdb.register_type(gdb.Type("std::__detail::_Hash_node_base", gdb.TYPE_CODE_STRUCT, 8, alignof=8))
+    node_base._fields = [gdb.Field("_M_nxt", gdb.pointer(node_base), 0)]
+    table = struct(f"std::_Hashtable<{key.name}, {pair.name}>",
+                   [("_M_buckets", gdb.pointer(gdb.pointer(node_base))), ("_M_bucket_count", basic("unsigned long")),
+                    ("_M_before_begin", node_base), ("_M_element_count", basic("unsigned long"))])
+    t = struct(f"std::unordered_map<{key.name}, {mapped.name}, std::hash<{key.name}>, "
+               f"std::equal_to<{key.name}>, {allocator.name} >",
+               [("_M_h", table)], template_args=(key, mapped, basic("int"), basic("int"), allocator))
+    value = variable(name, t)
+
+    value_offset = _align(8, pair.alignof)
+    # Nodes also cache the hash code after the value
+    nodes = _nodes(pairs, value_offset, _align(value_offset + pair.sizeof, 8) + 8)
+    for node, nxt in zip(nodes, nodes[1:] + [0]):
+        write_pointer(node, nxt)
+    write(value._address + 16, np.array([nodes[0] if nodes else 0, len(nodes)], "u8"))
+    return value
+
+
+def _variable_if_dynamic(value: int) -> gdb.Type:
+    """Eigen::internal::variable_if_dynamic<long, value>, which is empty unless value is Dynamic"""
+    name = f"Eigen::internal::variable_if_dynamic<long, {value}>"
+    if name in gdb._type_registry:
+        return gdb._type_registry[name]
+    if value == -1:
+        return struct(name, [("m_value", basic("long"))], template_args=(basic("long"), value))
+    return gdb.register_type(gdb.Type(name, gdb.TYPE_CODE_STRUCT, 1, template_args=(basic("long"), value),
+                                      alignof=1))
+
+
+def _with_base(name: str, base: gdb.Type, template_args) -> gdb.Type:
+    return gdb.register_type(gdb.Type(name, gdb.TYPE_CODE_STRUCT, base.sizeof, template_args=template_args,
+                                      fields=[gdb.Field(base.name, base, 0, is_base_class=True)],
+                                      alignof=base.alignof))
+
+
+def eigen_matrix_type(element: gdb.Type, rows: int, cols: int, row_major: bool = False,
+                      kind: str = "Matrix") -> gdb.Type:
+    """Eigen::Matrix or Eigen::Array, where -1 (Eigen::Dynamic) dimensions are sized at run time"""
+    options = 1 if row_major else 0
+    args = f"{element.name}, {rows}, {cols}, {options}, {rows}, {cols}"
+    name = f"Eigen::{kind}<{args}>"
+    if name in gdb._type_registry:
+        return gdb._type_registry[name]
+
+    members = []
+    if -1 in (rows, cols):
+        members.append(("m_data", gdb.pointer(element)))
+        size = -1
+    else:
+        size = rows * cols
+        plain_array = struct(f"Eigen::internal::plain_array<{element.name}, {size}, {options}, 16>",
+                             [("array", gdb.array(element, size))])
+        members.append(("m_data", plain_array))
+    if rows == -1:
+        members.append(("m_rows", basic("long")))
+    if cols == -1:
+        members.append(("m_cols", basic("long")))
+    storage = struct(f"Eigen::DenseStorage<{element.name}, {size}, {rows}, {cols}, {options}>", members)
+    base = struct(f"Eigen::PlainObjectBase<Eigen::{kind}<{args}> >", [("m_storage", storage)])
+    return _with_base(name, base, (element, rows, cols, options, rows, cols))
+
+
+def eigen_matrix(name, element: gdb.Type, values, row_major: bool = False, fixed: bool = False,
+                 kind: str = "Matrix") -> gdb.Value:
+    values = np.asarray(values, _DTYPES.get(element.name))
+    rows, cols = values.shape
+    t = eigen_matrix_type(element, rows if fixed else -1, cols if fixed else -1, row_major, kind)
+    value = variable(name, t)
+    data = values if row_major else values.T
+    if fixed:
+        write(value._address, data)
+    else:
+        write(value._address, np.array([alloc_array(data), rows, cols], "u8"))
+    return value
+
+
+def eigen_vector(name, element: gdb.Type, values) -> gdb.Value:
+    """Eigen::Matrix<T, Dynamic, 1>, as Eigen::VectorXd"""
+    values = np.asarray(values, _DTYPES.get(element.name))
+    value = variable(name, eigen_matrix_type(element, -1, 1))
+    write(value._address, np.array([alloc_array(values), len(values)], "u8"))
+    return value
+
+
+def eigen_map(name, element: gdb.Type, values, outer_stride: int = 0) -> gdb.Value:
+    """
+    Eigen::Map of a column-major matrix, whose columns are outer_stride
+    elements apart if it is given (as for Eigen::OuterStride<>)
+    """
+    values = np.asarray(values, _DTYPES.get(element.name))
+    rows, cols = values.shape
+    plain = eigen_matrix_type(element, -1, -1)
+    outer = -1 if outer_stride else 0
+    stride = struct(f"Eigen::Stride<{outer}, 0>",
+                    [("m_outer", _variable_if_dynamic(outer)), ("m_inner", _variable_if_dynamic(0))])
+    map_base = struct(f"Eigen::MapBase<Eigen::Map<{plain.name}> >",
+                      [("m_data", gdb.pointer(element)), ("m_rows", _variable_if_dynamic(-1)),
+                       ("m_cols", _variable_if_dynamic(-1))])
+    t = struct(f"Eigen::Map<{plain.name}, 0, {stride.name} >",
+               [("MapBase", map_base), ("m_stride", stride)], template_args=(plain, 0, stride))
+    t._fields[0].is_base_class = True
+    value = variable(name, t)
+
+    padded = np.zeros((cols, max(outer_stride, rows)), values.dtype)
+    padded[:, :rows] = values.T
+    write(value._address, np.array([alloc_array(padded), rows, cols], "u8"))
+    if outer_stride:
+        write(value._address + stride.fields()[0].bitpos // 8 + t.fields()[1].bitpos // 8,
+              np.array([outer_stride], "u8"))
+    return value
@@ -0,0 +1,31 @@
+// Program debugged by bench_remote.py. It stops at the breakpoint on the
+// line marked below, with every benchmarked variable initialised
+#include <array>
+#include <complex>
+#include <cstdlib>
+#include <vector>
+
+int main(int argc, char** argv)
+{
+    const int n = argc > 1 ? std::atoi(argv[1]) : 100000;
+
+    std::vector<double> vector(n);
+    std::vector<std::complex<float>> complex_vector(n);
+    std::vector<bool> vector_bool(n);
+    for (int i = 0; i < n; ++i) {
+        vector[i] = i;
+        complex_vector[i] = std::complex<float>(i, -i);
+        vector_bool[i] = i % 3 == 0;
+    }
+
+    std::vector<std::array<int*, 10>> nested(n / 100);
+    for (auto& row : nested) {
+        for (auto& p : row) {
+            p = new int[10]();
+        }
+    }
+
+    std::vector<std::vector<double>> vector_of_vectors(n / 1000, std::vector<double>(1000, 1.0));
+
+    return 0;  // break here
+}
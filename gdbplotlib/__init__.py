@@ -1 +1,9 @@
-from . import plot, save
\ No newline at end of file
+try:
+    import gdb  # pylint: disable=E0401
+except ImportError:
+    # Imported outside of GDB, as in the renderer process, where there are no
+    # commands to register
+    pass
+else:
+    from . import capture, plot, save, stats, watch
+    from .lazy import LazyArray, lazy
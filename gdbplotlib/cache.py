@@ -0,0 +1,212 @@
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+import gdb  # pylint: disable=E0401
+import numpy as np
+
+from . import stats
+
+DEFAULT_BUDGET_MIB = 256
+DEFAULT_PAGE_SIZE = 4096
+PAGE_CACHE_BUDGET = 16 * 2**20
+
+
+class SnapshotCache:
+    """
+    LRU cache of extracted arrays, bounded by their total size in bytes.
+    Every entry is dropped whenever the inferior may have changed, which is
+    tracked by a stop generation counter
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.generation = 0
+        self.entries = OrderedDict()
+        self.size = 0
+
+        gdb.events.stop.connect(self.invalidate)
+        gdb.events.memory_changed.connect(self.invalidate)
+        gdb.events.register_changed.connect(self.invalidate)
+        gdb.events.inferior_call.connect(self.invalidate)
+        gdb.events.exited.connect(self.invalidate)
+        gdb.events.new_objfile.connect(self.invalidate)
+        gdb.events.clear_objfiles.connect(self.invalidate)
+
+    def invalidate(self, event=None):
+        self.generation += 1
+        self.clear()
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def resize(self, budget: int):
+        self.budget = budget
+        self.evict()
+
+    def evict(self):
+        while self.entries and self.size > self.budget:
+            _, data = self.entries.popitem(last=False)
+            self.size -= data.nbytes
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        data = self.entries.get((self.generation, key))
+        if data is not None:
+            self.entries.move_to_end((self.generation, key))
+            if stats.enabled:
+                stats.count("snapshot_cache_hits")
+        return data
+
+    def put(self, key: Hashable, data: np.ndarray):
+        if data.nbytes > self.budget:
+            return
+
+        # Cached arrays are shared between commands, so they must not be modified
+        data.flags.writeable = False
+        self.entries[(self.generation, key)] = data
+        self.size += data.nbytes
+        self.evict()
+
+
+snapshot_cache = SnapshotCache(DEFAULT_BUDGET_MIB * 2**20)
+
+
+class PageCache:
+    """
+    LRU cache of inferior memory, in aligned pages of a fixed size. Reads are
+    rounded out to whole pages, and every run of missing pages is fetched
+    with a single read_memory call, so small neighbouring reads (such as the
+    elements of a container extracted one at a time) share a round trip to
+    the target. Every page is dropped whenever the inferior may have changed,
+    or another inferior is selected
+    """
+
+    def __init__(self, page_size: int, budget: int):
+        self.page_size = page_size
+        self.budget = budget
+        self.pages = OrderedDict()
+        # The number of the inferior the pages were read from
+        self.inferior = None
+
+        gdb.events.stop.connect(self.clear)
+        gdb.events.memory_changed.connect(self.clear)
+        gdb.events.inferior_call.connect(self.clear)
+        gdb.events.exited.connect(self.clear)
+        # Loading another executable or core file changes the memory without a stop
+        gdb.events.new_objfile.connect(self.clear)
+        gdb.events.clear_objfiles.connect(self.clear)
+
+    def clear(self, event=None):
+        self.pages.clear()
+
+    def resize(self, page_size: int):
+        self.page_size = page_size
+        self.clear()
+
+    @staticmethod
+    def read_memory(address: int, length: int):
+        data = gdb.selected_inferior().read_memory(address, length)
+        if stats.enabled:
+            stats.count("read_memory")
+            stats.count("bytes_read", length)
+        return data
+
+    def fetch(self, first_page: int, last_page: int):
+        page_size = self.page_size
+        data = self.read_memory(first_page * page_size, (last_page - first_page) * page_size)
+        for page in range(first_page, last_page):
+            offset = (page - first_page) * page_size
+            self.pages[page] = bytes(data[offset:offset + page_size])
+
+    def read(self, address: int, length: int):
+        page_size = self.page_size
+        # Large reads gain nothing from the cache, and would only flush it
+        if not page_size or length > self.budget // 4:
+            return self.read_memory(address, length)
+
+        inferior = gdb.selected_inferior().num
+        if inferior != self.inferior:
+            self.clear()
+            self.inferior = inferior
+
+        first_page = address // page_size
+        last_page = (address + length - 1) // page_size + 1
+        try:
+            missing = None
+            for page in range(first_page, last_page + 1):
+                if page < last_page and page not in self.pages:
+                    if missing is None:
+                        missing = page
+                elif missing is not None:
+                    self.fetch(missing, page)
+                    missing = None
+        except gdb.MemoryError:
+            # Part of a page is not readable, so only the requested bytes are read
+            return self.read_memory(address, length)
+
+        if stats.enabled:
+            stats.count("page_cache_reads")
+        for page in range(first_page, last_page):
+            self.pages.move_to_end(page)
+        while len(self.pages) * page_size > self.budget:
+            self.pages.popitem(last=False)
+
+        offset = address - first_page * page_size
+        if last_page - first_page == 1:
+            return memoryview(self.pages[first_page])[offset:offset + length]
+        data = b"".join(self.pages[page] for page in range(first_page, last_page))
+        return memoryview(data)[offset:offset + length]
+
+
+page_cache = PageCache(DEFAULT_PAGE_SIZE, PAGE_CACHE_BUDGET)
+
+
+class CacheSize(gdb.Parameter):
+    """
+    Controls the memory budget, in MiB, of the cache of extracted variables.
+    Variables extracted again at the same stop are served from this cache.
+    A size of 0 disables the cache
+    """
+
+    set_doc = "Set the size of the gdbplotlib variable cache, in MiB."
+    show_doc = "Show the size of the gdbplotlib variable cache, in MiB."
+
+    def __init__(self):
+        super(CacheSize, self).__init__("gdbplotlib-cache-size", gdb.COMMAND_DATA, gdb.PARAM_ZUINTEGER)
+        self.value = DEFAULT_BUDGET_MIB
+
+    def get_set_string(self):
+        snapshot_cache.resize(self.value * 2**20)
+        return ""
+
+    def get_show_string(self, svalue):
+        return f"The size of the gdbplotlib variable cache is {svalue} MiB."
+
+
+CacheSize()
+
+
+class PageSize(gdb.Parameter):
+    """
+    Controls the size, in bytes, of the pages in which inferior memory is
+    read and cached. Larger pages read further ahead of each access, which
+    saves round trips over slow connections to remote targets. A size of 0
+    disables the page cache
+    """
+
+    set_doc = "Set the size of the pages gdbplotlib reads memory in, in bytes."
+    show_doc = "Show the size of the pages gdbplotlib reads memory in, in bytes."
+
+    def __init__(self):
+        super(PageSize, self).__init__("gdbplotlib-page-size", gdb.COMMAND_DATA, gdb.PARAM_ZUINTEGER)
+        self.value = DEFAULT_PAGE_SIZE
+
+    def get_set_string(self):
+        page_cache.resize(self.value)
+        return ""
+
+    def get_show_string(self, svalue):
+        return f"gdbplotlib reads memory in pages of {svalue} bytes."
+
+
+PageSize()
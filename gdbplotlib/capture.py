@@ -0,0 +1,291 @@
+import json
+import os
+import zipfile
+from typing import List, Optional
+
+import gdb  # pylint: disable=E0401
+import numpy as np
+
+from . import data_extractor
+from . import stats
+from .save import metadata, variable_names
+from .type_handler import JaggedDataError
+from .type_set import UnkownTypeError
+
+USAGE = """Usage: capture add VAR [every N [hits]] [at BREAKPOINT]
+       capture remove [VAR...]
+       capture list
+       capture flush FILE.npz
+       capture png DIRECTORY"""
+
+# Snapshot buffers start with room for this many snapshots
+INITIAL_CAPACITY = 16
+
+# Errors reading a variable at a stop, which only skip that variable's snapshot
+READ_ERRORS = (
+    gdb.error, data_extractor.VariableError, data_extractor.SliceSyntaxError, UnkownTypeError, JaggedDataError
+)
+
+
+class SnapshotBuffer:
+    """
+    Snapshots of the same shape and dtype, stacked along a new first axis of
+    a preallocated array, whose capacity is doubled whenever it fills up
+    """
+
+    def __init__(self, snapshot: np.ndarray):
+        self.data = np.empty((INITIAL_CAPACITY, *snapshot.shape), snapshot.dtype)
+        self.stops = np.empty(INITIAL_CAPACITY, np.int64)
+        self.size = 0
+
+    def fits(self, snapshot: np.ndarray) -> bool:
+        return snapshot.shape == self.data.shape[1:] and snapshot.dtype == self.data.dtype
+
+    def append(self, snapshot: np.ndarray, stop: int):
+        if self.size == len(self.data):
+            data = np.empty((2 * len(self.data), *self.data.shape[1:]), self.data.dtype)
+            data[:self.size] = self.data
+            self.data = data
+            self.stops = np.concatenate([self.stops, np.empty_like(self.stops)])
+
+        self.data[self.size] = snapshot
+        self.stops[self.size] = stop
+        self.size += 1
+
+    @property
+    def snapshots(self) -> np.ndarray:
+        return self.data[:self.size]
+
+
+class Capture:
+    """
+    A variable to snapshot at every Nth stop of the program, optionally only
+    counting the stops at a given breakpoint (by number or location)
+    """
+
+    def __init__(self, var: str, every: int = 1, at: Optional[str] = None):
+        self.var = var
+        self.every = every
+        self.at = at
+        self.hits = 0
+        # A new buffer is started whenever the shape or dtype of the variable changes
+        self.buffers: List[SnapshotBuffer] = []
+
+    def __str__(self) -> str:
+        where = "" if self.at is None else f" at {self.at}"
+        return f"{self.var} every {self.every}{where}"
+
+    def matches(self, breakpoints) -> bool:
+        """
+        Counts a stop at the given breakpoints if it concerns this capture,
+        and returns whether a snapshot is due
+        """
+        if self.at is not None and not any(self.at in (str(b.number), b.location) for b in breakpoints):
+            return False
+        self.hits += 1
+        return self.hits % self.every == 0
+
+    def append(self, snapshot: np.ndarray, stop: int):
+        if not self.buffers or not self.buffers[-1].fits(snapshot):
+            self.buffers.append(SnapshotBuffer(snapshot))
+        self.buffers[-1].append(snapshot, stop)
+
+    @property
+    def size(self) -> int:
+        return sum(b.size for b in self.buffers)
+
+
+captures: List[Capture] = []
+# The number of stops since the first capture was added, recorded with every
+# snapshot
+stop_count = 0
+
+
+def read_snapshots(due: List[Capture]) -> List[Optional[np.ndarray]]:
+    """
+    Reads the variables of the captures that are due, all in one pass. If any
+    of them cannot be read at this stop (as when it is out of scope), the
+    others are read one by one, and the ones that fail are skipped
+    """
+    try:
+        return data_extractor.extract_vars([c.var for c in due])
+    except READ_ERRORS:
+        pass
+
+    snapshots = []
+    for c in due:
+        try:
+            snapshots.extend(data_extractor.extract_vars([c.var]))
+        except READ_ERRORS as e:
+            gdb.write(f"capture: {c.var}: {e}\n", gdb.STDERR)
+            snapshots.append(None)
+    return snapshots
+
+
+def on_stop(event):
+    global stop_count
+    stop_count += 1
+
+    breakpoints = getattr(event, "breakpoints", ())
+    due = [c for c in captures if c.matches(breakpoints)]
+    if not due:
+        return
+
+    with stats.timed("capture"):
+        for c, snapshot in zip(due, read_snapshots(due)):
+            if snapshot is not None:
+                c.append(np.asarray(snapshot), stop_count)
+                if stats.enabled:
+                    stats.count("capture_snapshots")
+
+
+def buffer_names(name: str, n_buffers: int) -> List[str]:
+    return [name if i == 0 else f"{name}_part{i + 1}" for i in range(n_buffers)]
+
+
+def flush(filename: str):
+    """
+    Writes the snapshots of every capture to a NumPy archive, and clears them.
+    The snapshots of a variable are stacked along a new first axis, with the
+    stop at which each was taken in the _stops entry of the same name. If the
+    shape of the variable changed, each run of snapshots of the same shape is
+    stored in its own entry, suffixed _part2, _part3 and so on
+    """
+    index = {}
+    with zipfile.ZipFile(filename, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        for c, name in zip(captures, variable_names([c.var for c in captures])):
+            for buffer, entry in zip(c.buffers, buffer_names(name, len(c.buffers))):
+                with archive.open(f"{entry}.npy", "w", force_zip64=True) as member:
+                    np.lib.format.write_array(member, buffer.snapshots)
+                with archive.open(f"{entry}_stops.npy", "w") as member:
+                    np.lib.format.write_array(member, buffer.stops[:buffer.size])
+                index[entry] = metadata(c.var, buffer.snapshots.shape, buffer.snapshots.dtype)
+                index[entry].update(every=c.every, at=c.at)
+            c.buffers = []
+
+        # Stored as a string array, so that it can be loaded without pickle
+        with archive.open("__metadata__.npy", "w") as member:
+            np.lib.format.write_array(member, np.array(json.dumps(index)))
+
+
+def render(filename: str, var: str, snapshots: np.ndarray):
+    """
+    Draws the snapshots of a variable to a PNG file with the Agg backend,
+    without going through pyplot, so that it works without a display and
+    leaves the interactive backend alone. Scalars are drawn against the
+    snapshot number, 1D variables as an image with a row per snapshot, and
+    2D variables as an image of the last snapshot
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if np.iscomplexobj(snapshots):
+        snapshots = np.abs(snapshots)
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    if snapshots.ndim == 1:
+        ax.plot(snapshots)
+        ax.set_xlabel("Snapshot")
+        ax.grid()
+    else:
+        image = snapshots if snapshots.ndim == 2 else snapshots[-1]
+        mappable = ax.imshow(image, aspect="auto", interpolation="nearest")
+        figure.colorbar(mappable)
+        if snapshots.ndim == 2:
+            ax.set_xlabel("Index")
+            ax.set_ylabel("Snapshot")
+    ax.set_title(var)
+    figure.savefig(filename)
+
+
+def render_all(directory: str):
+    if not any(c.buffers for c in captures):
+        gdb.write("No snapshots to draw (capture flush clears the snapshots it saves)\n")
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    for c, name in zip(captures, variable_names([c.var for c in captures])):
+        for buffer, entry in zip(c.buffers, buffer_names(name, len(c.buffers))):
+            snapshots = buffer.snapshots
+            if snapshots.dtype.names is not None or snapshots.ndim > 3:
+                gdb.write(f"capture: cannot render {c.var} of shape {snapshots.shape[1:]}\n", gdb.STDERR)
+                continue
+            render(os.path.join(directory, f"{entry}.png"), c.var, snapshots)
+
+
+def parse_add(argv: List[str]) -> Capture:
+    if not argv:
+        raise gdb.GdbError(USAGE)
+
+    var, options = argv[0], argv[1:]
+    every, at = 1, None
+    while options:
+        if options[0] == "every" and len(options) >= 2:
+            try:
+                every = int(options[1])
+            except ValueError:
+                every = 0
+            if every < 1:
+                raise gdb.GdbError(f"Number of hits must be a positive integer, not {options[1]}")
+            options = options[3:] if options[2:3] == ["hits"] else options[2:]
+        elif options[0] == "at" and len(options) >= 2:
+            at, options = options[1], options[2:]
+        else:
+            raise gdb.GdbError(USAGE)
+
+    return Capture(var, every, at)
+
+
+def remove(names: List[str]):
+    for c in list(captures):
+        if not names or c.var in names:
+            captures.remove(c)
+    if not captures:
+        gdb.events.stop.disconnect(on_stop)
+
+
+class CaptureCommand(gdb.Command):
+    """
+    Record snapshots of variables every time the program stops, without
+    drawing anything, for scripted and batch sessions.
+    Usage: capture add VAR [every N [hits]] [at BREAKPOINT]
+           capture remove [VAR...]
+           capture list
+           capture flush FILE.npz
+           capture png DIRECTORY
+    """
+
+    def __init__(self):
+        super(CaptureCommand, self).__init__("capture", gdb.COMMAND_OBSCURE)
+
+    def invoke(self, args, from_tty):
+        global stop_count
+        argv = args.split()
+
+        if not argv:
+            raise gdb.GdbError(USAGE)
+        elif argv[0] == "add":
+            capture = parse_add(argv[1:])
+            if not captures:
+                stop_count = 0
+                gdb.events.stop.connect(on_stop)
+            captures.append(capture)
+        elif argv[0] == "remove":
+            if captures:
+                remove(argv[1:])
+        elif argv[0] == "list" and len(argv) == 1:
+            for c in captures:
+                gdb.write(f"{c}: {c.size} snapshots, {c.hits} hits\n")
+        elif argv[0] == "flush" and len(argv) == 2:
+            with stats.timed("save"):
+                flush(argv[1])
+        elif argv[0] == "png" and len(argv) == 2:
+            with stats.timed("plot"):
+                render_all(argv[1])
+        else:
+            raise gdb.GdbError(USAGE)
+
+
+CaptureCommand()
@@ -1,14 +1,24 @@
 import re
-from typing import List
+from typing import List, Optional, Tuple
 
 import gdb  # pylint: disable=E0401
 import gdb.types  # pylint: disable=E0401
 import numpy as np
 
+from .cache import snapshot_cache
 from .default import default
-from .type_set import TypeSet
+from .memory import ReadBatch
+from .type_set import TypeSet, type_key
+from . import stats
 from . import util
 
+CHUNK_BYTES = 64 * 2**20
+SLICED_PROJECTION_REGEX = re.compile("(.*\\])\\.(\\w+)")
+# A member of a plain chain of identifiers, members and constant subscripts,
+# such as s.x or a[2].p->x. Other expressions ending in a member, such as
+# &s.x or *p.q, are left to GDB, as operators bind looser than the member
+MEMBER_REGEX = re.compile("([A-Za-z_]\\w*(?:\\[\\d+\\])*(?:(?:\\.|->)\\w+(?:\\[\\d+\\])*)*)(\\.|->)(\\w+)")
+
 
 class SliceSyntaxError(Exception):
     pass
@@ -47,17 +57,262 @@ def parse_var(var: str):
     return var_base, slices
 
 
-def extract_var(var: str, type_set: TypeSet = default) -> np.ndarray:
-    base_var, var_slice = parse_var(var)
+def evaluate_expression(expression: str, values: dict) -> gdb.Value:
+    """
+    Evaluates an expression, remembering its value in values. Member
+    accesses, such as s.x or p->x (see MEMBER_REGEX), are evaluated by
+    taking the member of the (remembered) value of their parent, so that
+    for s.x and s.y, s is only evaluated once
+    """
+    if expression in values:
+        if stats.enabled:
+            stats.count("shared_evaluations")
+        return values[expression]
+
+    value = None
+    member = MEMBER_REGEX.fullmatch(expression)
+    if member is not None:
+        parent, operator, name = member.groups()
+        try:
+            value = evaluate_expression(parent, values)
+            value = (value.dereference() if operator == "->" else value)[name]
+        except gdb.error:
+            # Not a member access after all, so GDB parses the whole expression
+            value = None
+
+    if value is None:
+        with stats.timed("parse_and_eval"):
+            if stats.enabled:
+                stats.count("parse_and_eval")
+            value = gdb.parse_and_eval(expression)
+
+    values[expression] = value
+    return value
+
+
+def evaluate_var(var: str, values: Optional[dict] = None) -> Tuple[str, List[slice], gdb.Value]:
+    if SLICED_PROJECTION_REGEX.fullmatch(var):
+        # Anything after the slice would otherwise be ignored
+        raise VariableError(f"Invalid variable: {var}")
+
+    with stats.timed("parse_slice"):
+        base_var, var_slice = parse_var(var)
 
     try:
-        gdb_data = gdb.parse_and_eval(base_var)
+        gdb_data = evaluate_expression(base_var, {} if values is None else values)
     except gdb.error:
         raise VariableError(f"Invalid variable: {var}")
 
-    gdb_type = gdb.types.get_basic_type(gdb_data.type)
-    type_handler = type_set.get_handler(gdb_type)
+    return base_var, var_slice, gdb_data
+
+
+def split_projection(var: str) -> Optional[Tuple[str, str]]:
+    """
+    Splits a field projection, such as pts.x[:100] or pts[:100].x, into the
+    variable holding the records (pts[:100]) and the field to take from
+    them (x)
+    """
+    sliced_projection = SLICED_PROJECTION_REGEX.fullmatch(var)
+    if sliced_projection is not None:
+        return sliced_projection.group(1), sliced_projection.group(2)
+
+    base_var, slice_str = util.split_variable_and_slice(var)
+    record_var, dot, field = base_var.rpartition(".")
+    if not dot or not record_var or not field.isidentifier():
+        return None
+
+    if slice_str is not None:
+        record_var = f"{record_var}[{slice_str}]"
+    return record_var, field
+
+
+def field_dtype(var: str, dtype: np.dtype, field: str) -> np.dtype:
+    if dtype.names is None or field not in dtype.names:
+        raise VariableError(f"Invalid variable: {var}")
+    return dtype.fields[field][0]
+
+
+def selected_context() -> tuple:
+    """
+    Identifies the selected inferior, thread and frame, in which the same
+    expression can refer to different variables. Frame levels only change
+    meaning when the program runs, which clears the snapshot cache anyway
+    """
+    thread = gdb.selected_thread()
+    context = (gdb.selected_inferior().num, None if thread is None else thread.num)
+    try:
+        frame = gdb.selected_frame()
+    except gdb.error:
+        # No process, so only static variables can be evaluated
+        return context
+    if hasattr(frame, "level"):
+        return context + (frame.level(),)
+    return context + (frame.pc(), int(frame.read_register("sp")))
+
+
+def snapshot_key(base_var: str, var_slice: List[slice], gdb_data: gdb.Value, type_set: TypeSet):
+    """
+    Gets the key of a variable in the snapshot cache, or None if it must not
+    be cached: values that are not in memory, such as register variables and
+    convenience variables, can change without the memory changing
+    """
+    address = gdb_data.address
+    if address is None:
+        return None
+    return (
+        base_var, tuple((s.start, s.stop, s.step) for s in var_slice),
+        int(address), type_key(gdb_data.type), id(type_set), selected_context()
+    )
+
+
+def extract_vars(variables: List[str], type_set: TypeSet = default) -> List[np.ndarray]:
+    """
+    Extracts several variables in one go. Expressions shared by the variables
+    (such as s, for s.x and s.y) are evaluated once, variables given more than
+    once are extracted once, and the memory of every variable is read in a
+    single pass, in which neighbouring or overlapping buffers of different
+    variables are read together (see ReadBatch)
+
+    Parameters:
+    variables (List[str]): The variables, with optional slices
+    type_set (TypeSet): The type handlers to use
+
+    Returns:
+    List[np.ndarray]: The array of each variable, in the order given
+    """
+    values = {}
+    results = {}
+    projections = {}
+    pending = []
+
+    def add(var: str):
+        if var in results or var in projections or any(p[0] == var for p in pending):
+            return
+
+        try:
+            base_var, var_slice, gdb_data = evaluate_var(var, values)
+        except VariableError:
+            projection = split_projection(var)
+            if projection is None:
+                raise
+            # A field of an array of structs is a view of the record array, so
+            # the other fields do not need to be read again
+            projections[var] = projection
+            add(projection[0])
+            return
+
+        key = snapshot_key(base_var, var_slice, gdb_data, type_set)
+        cached = None if key is None else snapshot_cache.get(key)
+        if cached is not None:
+            results[var] = cached
+            return
+
+        type_handler = type_set.get_handler(gdb.types.get_basic_type(gdb_data.type))
+        pending.append((var, key, type_handler, gdb_data, var_slice))
+
+    for var in variables:
+        add(var)
+
+    with stats.timed("extract"):
+        if len(pending) == 1:
+            # Nothing to read together with, so extract_all can return a view
+            # of the memory read where possible
+            _, _, type_handler, gdb_data, var_slice = pending[0]
+            outs = [type_handler.extract_all(gdb_data, var_slice)]
+        else:
+            batch = ReadBatch()
+            outs = []
+            for _, _, type_handler, gdb_data, var_slice in pending:
+                shape, dtype = type_handler.result_layout(gdb_data, list(var_slice))
+                out = np.empty(shape, dtype, order=type_handler.result_order(gdb_data, list(var_slice)))
+                type_handler.extract_into(gdb_data, list(var_slice), out, batch)
+                outs.append(out)
+            with stats.timed("read"):
+                batch.execute()
+
+    with stats.timed("convert"):
+        for (var, key, _, _, _), out in zip(pending, outs):
+            results[var] = np.squeeze(np.asarray(out))
+            if key is not None:
+                snapshot_cache.put(key, results[var])
+
+    def resolve(var: str) -> np.ndarray:
+        if var not in results:
+            record_var, field = projections[var]
+            records = resolve(record_var)
+            field_dtype(var, records.dtype, field)
+            results[var] = records[field]
+        return results[var]
+
+    return [resolve(var) for var in variables]
+
+
+def extract_var(var: str, type_set: TypeSet = default) -> np.ndarray:
+    """
+    Extracts a variable, with optional slice. Unlike the arrays returned by
+    extract_vars, which may be shared with the snapshot cache or be views of
+    the memory read, and so are read-only, the array returned is writable
+    """
+    data = extract_vars([var], type_set)[0]
+    return data if data.flags.writeable else data.copy(order="K")
+
+
+def extract_var_chunks(var: str, chunk_bytes: Optional[int] = None, type_set: TypeSet = default):
+    """
+    Extracts a variable in pieces, so that arrays larger than memory can be
+    written out. The selection is split along the outermost dimension of the
+    variable that has more than one selected element
+
+    Parameters:
+    var (str): The variable, with optional slice
+    chunk_bytes (Optional[int]): Approximate size of each piece, by default
+                                 CHUNK_BYTES
+    type_set (TypeSet): The type handlers to use
+
+    Returns:
+    Tuple[Tuple[int, ...], np.dtype, Iterator]: The shape (as returned by
+        extract_var) and dtype of the whole variable, and an iterator of
+        (offset, chunk) pairs, where offset is the index of the chunk's first
+        element in the flattened variable
+    """
+    try:
+        _, var_slice, gdb_data = evaluate_var(var)
+    except VariableError:
+        projection = split_projection(var)
+        if projection is None:
+            raise
+
+        record_var, field = projection
+        shape, dtype, chunks = extract_var_chunks(record_var, chunk_bytes, type_set)
+        sub_dtype = field_dtype(var, dtype, field)
+        sub_size = int(np.prod(sub_dtype.shape))
+        return (shape + sub_dtype.shape, sub_dtype.base,
+                ((offset * sub_size, chunk[field]) for offset, chunk in chunks))
+
+    type_handler = type_set.get_handler(gdb.types.get_basic_type(gdb_data.type))
+
+    full_shape, dtype = type_handler.result_layout(gdb_data, list(var_slice))
+    shape = tuple(n for n in full_shape if n != 1)
+
+    top_shape = type_handler.shape(gdb_data) if type_handler.contained_type(gdb_data) is not None else ()
+    slices = list(var_slice) + [slice(None)] * (len(top_shape) - len(var_slice))
+    ranges = [util.slice_range(s, n) for s, n in zip(slices, top_shape)]
+    axis = next((i for i, r in enumerate(ranges) if len(r) > 1), None)
+
+    def chunks():
+        if axis is None or 0 in full_shape:
+            yield 0, type_handler.extract_all(gdb_data, list(slices))
+            return
+
+        row_bytes = int(np.prod(full_shape[axis + 1:])) * dtype.itemsize
+        rows = max(1, (chunk_bytes or CHUNK_BYTES) // max(row_bytes, 1))
+        offset = 0
+        for start in range(0, len(ranges[axis]), rows):
+            chunk_slices = list(slices)
+            chunk_slices[axis] = util.range_slice(ranges[axis][start:start + rows], top_shape[axis] is not None)
+            with stats.timed("extract"):
+                chunk = np.asarray(type_handler.extract_all(gdb_data, chunk_slices))
+            yield offset, chunk
+            offset += chunk.size
 
-    out = type_handler.extract_all(gdb_data, var_slice)
-    out_np = np.squeeze(np.array(out))
-    return out_np
+    return shape, dtype, chunks()
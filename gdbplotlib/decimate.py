@@ -0,0 +1,196 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Lines with at most this many points per horizontal pixel are drawn whole
+MAX_POINTS_PER_PIXEL = 4
+# Scatter plots with at most this many points are drawn whole
+MAX_SCATTER_POINTS = 100000
+# Points are binned into the scatter grid this many at a time, to bound the
+# memory used for their cell indices
+SCATTER_CHUNK = 1 << 20
+# Bin widths of histograms are estimated from about this many samples
+HISTOGRAM_SAMPLE = 1 << 20
+
+
+def min_max(y: np.ndarray, start: int, stop: int, buckets: int) -> np.ndarray:
+    """
+    Gets the indices of the points of y[start:stop] that are needed to draw it
+    as a line buckets pixels wide: the first and last points, and the minimum
+    and maximum of every run of points falling in the same pixel. The line
+    drawn through them covers the same pixels as the line through every point
+    """
+    n = stop - start
+    if n <= MAX_POINTS_PER_PIXEL * buckets:
+        return np.arange(start, stop)
+
+    size = n // buckets
+    body = y[start:start + size * buckets].reshape(buckets, size)
+    offsets = start + size * np.arange(buckets)
+    extremes = [offsets + body.argmin(axis=1), offsets + body.argmax(axis=1)]
+
+    rest = y[start + size * buckets:stop]
+    if len(rest):
+        offset = start + size * buckets
+        extremes[0] = np.append(extremes[0], offset + rest.argmin())
+        extremes[1] = np.append(extremes[1], offset + rest.argmax())
+
+    # The minimum and maximum of each bucket are kept in the order they occur
+    pairs = np.sort(np.stack(extremes, axis=1), axis=1).reshape(-1)
+    return np.concatenate([[start], pairs, [stop - 1]])
+
+
+def grid_sample(x: np.ndarray, y: np.ndarray, xlim: Tuple[float, float], ylim: Tuple[float, float],
+                shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Gets the indices of the points needed to draw a scatter plot of x and y
+    with the given limits, shape pixels in size: one point per pixel that
+    any point falls in
+    """
+    (x0, x1), (y0, y1) = sorted(xlim), sorted(ylim)
+    width, height = shape
+    owners = np.full(width * height, -1, np.int64)
+
+    for start in range(0, len(x), SCATTER_CHUNK):
+        xs, ys = x[start:start + SCATTER_CHUNK], y[start:start + SCATTER_CHUNK]
+        visible = np.flatnonzero((xs >= x0) & (xs <= x1) & (ys >= y0) & (ys <= y1))
+        columns = ((xs[visible] - x0) * (width / ((x1 - x0) or 1))).astype(np.int64)
+        rows = ((ys[visible] - y0) * (height / ((y1 - y0) or 1))).astype(np.int64)
+        cells = np.minimum(columns, width - 1) * height + np.minimum(rows, height - 1)
+        # Of the points in the same pixel, the last one is kept
+        owners[cells] = start + visible
+
+    return owners[owners >= 0]
+
+
+class DecimatedLine:
+    """
+    A line plot of y against increasing x (or against its indices if x is
+    None), which only draws the points that can be told apart at the current
+    resolution. Whenever the x limits change, as when zooming or panning, the
+    points to draw are picked again from the whole of y
+    """
+
+    def __init__(self, ax, x: Optional[np.ndarray], y: np.ndarray, **kwargs):
+        self.ax = ax
+        self.x = x
+        self.y = y
+        self.line, = ax.plot(*self.points(0, len(y)), **kwargs)
+        # Callbacks to bound methods are only weakly referenced, so the
+        # lambda is what keeps this object alive along with the axes
+        ax.callbacks.connect("xlim_changed", lambda ax: self.update())
+
+    def points(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        indices = min_max(self.y, start, stop, max(int(self.ax.bbox.width), 1))
+        return indices if self.x is None else self.x[indices], self.y[indices]
+
+    def update(self):
+        x0, x1 = sorted(self.ax.get_xlim())
+        # One point either side of the view, so the line reaches its edges
+        if self.x is None:
+            start, stop = int(np.floor(x0)), int(np.ceil(x1)) + 1
+        else:
+            start, stop = np.searchsorted(self.x, x0) - 1, np.searchsorted(self.x, x1, side="right") + 1
+        start, stop = max(start, 0), min(stop, len(self.y))
+        if start < stop:
+            self.line.set_data(*self.points(start, stop))
+
+
+class DecimatedScatter:
+    """
+    A scatter plot that only draws one point per pixel, picked again from
+    every point whenever the limits of the axes change
+    """
+
+    def __init__(self, ax, x: np.ndarray, y: np.ndarray, **kwargs):
+        self.ax = ax
+        self.x = x
+        self.y = y
+        finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        indices = finite[:0]
+        if len(finite):
+            # The points with the extreme coordinates are kept, so that the
+            # axes are scaled to fit every point
+            extremes = finite[[x[finite].argmin(), x[finite].argmax(), y[finite].argmin(), y[finite].argmax()]]
+            xlim, ylim = x[extremes[:2]], y[extremes[2:]]
+            indices = np.union1d(grid_sample(x, y, xlim, ylim, self.pixels()), extremes)
+        self.collection = ax.scatter(x[indices], y[indices], **kwargs)
+        ax.callbacks.connect("xlim_changed", lambda ax: self.update())
+        ax.callbacks.connect("ylim_changed", lambda ax: self.update())
+
+    def pixels(self) -> Tuple[int, int]:
+        return max(int(self.ax.bbox.width), 1), max(int(self.ax.bbox.height), 1)
+
+    def update(self):
+        indices = grid_sample(self.x, self.y, self.ax.get_xlim(), self.ax.get_ylim(), self.pixels())
+        self.collection.set_offsets(np.column_stack([self.x[indices], self.y[indices]]))
+
+
+def plot(ax, *args, **kwargs):
+    """
+    Draws a decimated line from the arguments of ax.plot(y) or ax.plot(x, y),
+    where x must be increasing
+    """
+    x = None if len(args) == 1 else np.asarray(args[0])
+    DecimatedLine(ax, x, np.asarray(args[-1]), **kwargs)
+
+
+def scatter(ax, x: np.ndarray, y: np.ndarray, **kwargs):
+    x, y = np.asarray(x), np.asarray(y)
+    if len(x) <= MAX_SCATTER_POINTS or len(x) != len(y):
+        ax.scatter(x, y, **kwargs)
+    else:
+        DecimatedScatter(ax, x, y, **kwargs)
+
+
+def auto_bins(x: np.ndarray) -> np.ndarray:
+    """
+    Gets the bin edges NumPy would choose for bins="auto" (the narrower of the
+    Freedman-Diaconis and Sturges estimates), but with the interquartile range
+    estimated from a sample of x, which is much quicker for long arrays
+    """
+    lo, hi = x.min(), x.max()
+    if x.size <= HISTOGRAM_SAMPLE or not hi > lo:
+        return np.histogram_bin_edges(x, bins="auto")
+
+    sample = x[::x.size // HISTOGRAM_SAMPLE]
+    q1, q3 = np.percentile(sample, [25, 75])
+    width = (hi - lo) / (np.log2(x.size) + 1)
+    if q3 > q1:
+        width = min(width, 2 * (q3 - q1) * x.size ** (-1 / 3))
+    if x.dtype.kind in "iu":
+        # Narrower bins would leave gaps between the integers
+        width = max(width, 1)
+    return np.linspace(lo, hi, int(np.ceil((hi - lo) / width)) + 1)
+
+
+def histogram(x: np.ndarray, bins="auto") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes a histogram of x up front, so that only the counts and the bin
+    edges need to be drawn (with draw_histogram), rather than every sample
+    """
+    x = np.asarray(x)
+    if x.dtype == bool:
+        x = x.astype(np.uint8)
+    if x.dtype.kind == "f":
+        x = x[np.isfinite(x)]
+    if isinstance(bins, str) and bins == "auto" and x.size:
+        bins = auto_bins(x)
+    return np.histogram(x, bins=bins)
+
+
+def draw_histogram(ax, counts: np.ndarray, edges: np.ndarray, **kwargs):
+    if hasattr(ax, "stairs"):
+        # A single artist, which draws far quicker than a bar for every bin
+        ax.stairs(counts, edges, fill=True, **kwargs)
+    else:
+        ax.hist(edges[:-1], edges, weights=counts, **kwargs)
+
+
+# Recorded figure calls that are drawn by these functions, instead of by the
+# Axes method of the same name
+DRAW_FUNCTIONS = {
+    "decimated_plot": plot,
+    "decimated_scatter": scatter,
+    "histogram": draw_histogram,
+}
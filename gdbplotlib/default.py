@@ -1,10 +1,18 @@
 from .type_set import TypeSet
+from . import eigen_types
 from . import std_types
 
 default = TypeSet()
 default.register(std_types.StdVector)
 default.register(std_types.StdVectorBool)
 default.register(std_types.StdArray)
+default.register(std_types.StdDeque)
+default.register(std_types.StdList)
+default.register(std_types.StdForwardList)
+default.register(std_types.StdMap)
+default.register(std_types.StdUnorderedMap)
+default.register(eigen_types.EigenMatrix)
+default.register(eigen_types.EigenMap)
 default.register(std_types.Pointer)
 default.register(std_types.Array)
 default.register(std_types.Double)
@@ -12,4 +20,7 @@ default.register(std_types.Float)
 default.register(std_types.StdComplexDouble)
 default.register(std_types.StdComplexFloat)
 default.register(std_types.Integral)
-default.register(std_types.Bool)
\ No newline at end of file
+default.register(std_types.Bool)
+# Catches every struct not handled by a registered handler, including those
+# registered by users after this
+default.register_fallback(std_types.Struct)
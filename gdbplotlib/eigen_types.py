@@ -0,0 +1,208 @@
+from abc import abstractmethod
+from typing import List, Tuple, Optional
+
+import gdb  # pylint: disable=E0401
+import gdb.types  # pylint: disable=E0401
+import numpy as np
+
+from .memory import ReadBatch
+from .type_handler import TypeHandler
+from . import util
+
+# Eigen::Dynamic, the compile-time size of dimensions only known at run time
+DYNAMIC = -1
+# The bit of the Options template argument set for row-major storage
+ROW_MAJOR_BIT = 0x1
+
+
+def template_int(gdb_type: gdb.Type, n: int) -> int:
+    return int(gdb_type.template_argument(n))
+
+
+def dimension(gdb_value: gdb.Value) -> int:
+    """
+    Gets the value of an Eigen::internal::variable_if_dynamic, which only
+    stores its value if it is not known at compile time
+    """
+    value = template_int(gdb.types.get_basic_type(gdb_value.type), 1)
+    return int(gdb_value["m_value"]) if value == DYNAMIC else value
+
+
+def member_offset(gdb_type: gdb.Type, name: str) -> Optional[Tuple[int, gdb.Type]]:
+    """
+    Finds a member of a struct, or of any of its base classes, returning its
+    offset in bytes and its type
+    """
+    for field in gdb_type.fields():
+        if field.name == name:
+            return field.bitpos // 8, gdb.types.get_basic_type(field.type)
+        if field.is_base_class:
+            found = member_offset(gdb.types.get_basic_type(field.type), name)
+            if found is not None:
+                return field.bitpos // 8 + found[0], found[1]
+    return None
+
+
+class EigenDense(TypeHandler):
+    """
+    Base of the handlers of Eigen's dense matrices and arrays. Matrices are
+    2-dimensional, while vectors (those with a single row or column at compile
+    time) are 1-dimensional. Column-major matrices are read straight into
+    Fortran-ordered arrays
+    """
+
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+
+    @staticmethod
+    def plain_type(gdb_type: gdb.Type) -> gdb.Type:
+        """
+        Gets the Eigen::Matrix or Eigen::Array type describing the elements
+        """
+        return gdb_type
+
+    @abstractmethod
+    def storage(self, gdb_value: gdb.Value) -> Tuple[int, Tuple[int, int], Tuple[int, int]]:
+        """
+        Gets the address of the first element, the number of rows and
+        columns, and the strides of the rows and columns in elements
+        """
+        pass
+
+    def layout(self, gdb_value: gdb.Value) -> Tuple[int, Tuple[int, ...], Tuple[int, ...]]:
+        plain_type = self.plain_type(gdb.types.get_basic_type(gdb_value.type))
+        address, (rows, cols), (row_stride, col_stride) = self.storage(gdb_value)
+        if template_int(plain_type, 2) == 1:
+            return address, (rows,), (row_stride,)
+        if template_int(plain_type, 1) == 1:
+            return address, (cols,), (col_stride,)
+        return address, (rows, cols), (row_stride, col_stride)
+
+    def shape(self, gdb_value: gdb.Value) -> Tuple[Optional[int], ...]:
+        return self.layout(gdb_value)[1]
+
+    def contained_type(self, gdb_value: gdb.Value) -> Optional[gdb.Type]:
+        return self.element_type(gdb.types.get_basic_type(gdb_value.type))
+
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        return self.plain_type(gdb_type).template_argument(0)
+
+    def data_address(self, gdb_value: gdb.Value) -> Optional[int]:
+        address, shape, strides = self.layout(gdb_value)
+        return address if list(strides) == util.element_strides(shape) else None
+
+    def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
+        address, _, strides = self.layout(gdb_value)
+        element_type = self.contained_type(gdb_value)
+        offset = sum(i * stride for i, stride in zip(index, strides)) * element_type.sizeof
+        return gdb.Value(address + offset).cast(element_type.pointer()).dereference()
+
+    def _scalar_block(self, gdb_value: gdb.Value, slices: List[slice]):
+        # The element dtype, if the elements are scalars that can be read in bulk
+        _, _, current_slices, _, _, _, block = self._layout(gdb_value, slices)
+        if block is None or block[1]:
+            return None, current_slices
+        return block[0], current_slices
+
+    def result_order(self, gdb_value: gdb.Value, slices: List[slice]) -> str:
+        dtype, _ = self._scalar_block(gdb_value, list(slices))
+        strides = self.layout(gdb_value)[2]
+        # Column-major matrices are read into Fortran-ordered arrays
+        return "F" if dtype is not None and len(strides) == 2 and strides[0] < strides[1] else "C"
+
+    def extract_into(self, gdb_value: gdb.Value, slices: List[slice], out: np.ndarray,
+                     batch: Optional[ReadBatch] = None):
+        dtype, current_slices = self._scalar_block(gdb_value, list(slices))
+        if dtype is None:
+            super().extract_into(gdb_value, slices, out, batch)
+            return
+
+        address, shape, strides = self.layout(gdb_value)
+        if batch is not None:
+            batch.add(address, dtype, shape, current_slices, out, strides)
+        else:
+            out[...] = util.read_contiguous(address, dtype, shape, current_slices, strides)
+
+    def extract_all(self, gdb_value: gdb.Value, slices: List[slice]) -> np.ndarray:
+        dtype, current_slices = self._scalar_block(gdb_value, list(slices))
+        if dtype is None:
+            return super().extract_all(gdb_value, slices)
+
+        # A view of the memory read, so column-major matrices stay in Fortran order
+        address, shape, strides = self.layout(gdb_value)
+        return util.read_contiguous(address, dtype, shape, current_slices, strides)
+
+
+class EigenMatrix(EigenDense):
+    name_prefixes = ("Eigen::Matrix<", "Eigen::Array<")
+
+    @staticmethod
+    def can_handle(gdb_type: gdb.Type) -> bool:
+        return str(gdb_type).startswith(EigenMatrix.name_prefixes)
+
+    def storage(self, gdb_value: gdb.Value) -> Tuple[int, Tuple[int, int], Tuple[int, int]]:
+        gdb_type = gdb.types.get_basic_type(gdb_value.type)
+        storage = gdb_value["m_storage"]
+        # DenseStorage only holds the dimensions that are not fixed
+        rows, cols = template_int(gdb_type, 1), template_int(gdb_type, 2)
+        if rows == DYNAMIC:
+            rows = int(storage["m_rows"])
+        if cols == DYNAMIC:
+            cols = int(storage["m_cols"])
+
+        data = storage["m_data"]
+        if data.type.strip_typedefs().code == gdb.TYPE_CODE_PTR:
+            address = int(data)
+        else:
+            # Fixed-size matrices store their elements inline, in a plain_array
+            address = int(data["array"].address)
+
+        if template_int(gdb_type, 3) & ROW_MAJOR_BIT:
+            return address, (rows, cols), (cols, 1)
+        return address, (rows, cols), (1, rows)
+
+    def fixed_layout(self, gdb_type: gdb.Type) -> Optional[Tuple[int, Tuple[int, ...]]]:
+        rows, cols = template_int(gdb_type, 1), template_int(gdb_type, 2)
+        if DYNAMIC in (rows, cols):
+            return None
+        # Only layouts that are also C-ordered can be part of a larger block
+        if rows == 1 or cols == 1:
+            shape = (rows * cols,)
+        elif template_int(gdb_type, 3) & ROW_MAJOR_BIT:
+            shape = (rows, cols)
+        else:
+            return None
+
+        storage = member_offset(gdb_type, "m_storage")
+        data = None if storage is None else member_offset(storage[1], "m_data")
+        if data is None or data[1].code != gdb.TYPE_CODE_STRUCT:
+            return None
+        array = member_offset(data[1], "array")
+        if array is None:
+            return None
+        return storage[0] + data[0] + array[0], shape
+
+
+class EigenMap(EigenDense):
+    name_prefixes = ("Eigen::Map<", "Eigen::Ref<")
+
+    @staticmethod
+    def can_handle(gdb_type: gdb.Type) -> bool:
+        return str(gdb_type).startswith(EigenMap.name_prefixes)
+
+    @staticmethod
+    def plain_type(gdb_type: gdb.Type) -> gdb.Type:
+        return gdb.types.get_basic_type(gdb_type.template_argument(0))
+
+    def storage(self, gdb_value: gdb.Value) -> Tuple[int, Tuple[int, int], Tuple[int, int]]:
+        plain_type = self.plain_type(gdb.types.get_basic_type(gdb_value.type))
+        address = int(gdb_value["m_data"])
+        rows, cols = dimension(gdb_value["m_rows"]), dimension(gdb_value["m_cols"])
+
+        # A stride of 0 means the default: consecutive elements, and columns
+        # (or rows) stored one after the other
+        stride = gdb_value["m_stride"]
+        outer, inner = dimension(stride["m_outer"]), dimension(stride["m_inner"])
+        inner = inner or 1
+        if template_int(plain_type, 3) & ROW_MAJOR_BIT:
+            return address, (rows, cols), (outer or cols * inner, inner)
+        return address, (rows, cols), (inner, outer or rows * inner)
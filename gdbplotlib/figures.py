@@ -0,0 +1,57 @@
+from typing import Optional
+
+import numpy as np
+
+from . import decimate
+
+
+class Figure:
+    """
+    A figure recorded as a list of calls to be made on its Axes, for example
+    figure.plot(x) or figure.set_ylabel("PSD (dB)"). Recording the figure,
+    rather than drawing it straight away, lets it be drawn either in GDB's
+    process or in the renderer process
+    """
+
+    def __init__(self, projection: Optional[str] = None):
+        self.projection = projection
+        self.calls = []
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+
+        return record
+
+    def arrays(self, kind=np.ndarray):
+        for _, args, kwargs in self.calls:
+            for arg in (*args, *kwargs.values()):
+                if isinstance(arg, kind):
+                    yield arg
+
+    def map_arrays(self, function, kind=np.ndarray):
+        convert = lambda x: function(x) if isinstance(x, kind) else x
+        self.calls = [
+            (name, tuple(convert(a) for a in args), {k: convert(v) for k, v in kwargs.items()})
+            for name, args, kwargs in self.calls
+        ]
+
+
+def draw(figure: Figure):
+    import matplotlib.pyplot as plt
+    if figure.projection == "3d":
+        # Registers the 3d projection with Matplotlib versions before 3.2
+        import mpl_toolkits.mplot3d  # pylint: disable=W0611
+
+    fig = plt.figure()
+    ax = fig.add_subplot(projection=figure.projection)
+    for name, args, kwargs in figure.calls:
+        if name in decimate.DRAW_FUNCTIONS:
+            decimate.DRAW_FUNCTIONS[name](ax, *args, **kwargs)
+        else:
+            getattr(ax, name)(*args, **kwargs)
+
+    return fig
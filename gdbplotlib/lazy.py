@@ -0,0 +1,152 @@
+from typing import List, Optional, Tuple
+
+import gdb  # pylint: disable=E0401
+import gdb.types  # pylint: disable=E0401
+import numpy as np
+
+from . import data_extractor
+from . import stats
+from . import util
+from .default import default
+from .type_handler import TypeHandler
+from .type_set import TypeSet
+
+
+def dimension_sizes(gdb_value: gdb.Value, handler: TypeHandler, type_set: TypeSet) -> List[Optional[int]]:
+    """
+    Gets the size of every dimension of a (possibly nested) container, taking
+    the sizes of nested containers from its first element. Unbounded
+    dimensions have a size of None
+    """
+    sizes = []
+    while handler.contained_type(gdb_value) is not None:
+        shape = handler.shape(gdb_value)
+        sizes.extend(shape)
+        if 0 in shape:
+            break
+        gdb_value = handler.extract(gdb_value, (0,) * len(shape))
+        handler = type_set.get_handler(gdb.types.get_basic_type(gdb_value.type))
+    return sizes
+
+
+class LazyArray:
+    """
+    An array backed by a variable of the inferior, which is only read when a
+    concrete array is needed (by np.asarray, or any attribute of ndarray, as
+    in a[::1000].mean()), and then only for the selected elements. Indexing
+    with integers and slices gives further lazy views
+
+    Like extract_var, dimensions of a single element are dropped. The
+    variable is evaluated again every time it is read, so that the values
+    are those of the inferior at the time, but its shape is taken when the
+    first LazyArray is made
+    """
+
+    def __init__(self, expression: str, slices: List[slice], ranges: List[range], narrowed: List[bool],
+                 keep: List[bool], sizes: List[Optional[int]], dtype: np.dtype, type_set: TypeSet):
+        self.expression = expression
+        # The selection given with the expression, which is used for every
+        # dimension that has not been narrowed down since
+        self.slices = slices
+        self.ranges = ranges
+        self.narrowed = narrowed
+        self.keep = keep
+        self.sizes = sizes
+        self.dtype = dtype
+        self.type_set = type_set
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(len(r) for r, keep in zip(self.ranges, self.keep) if keep)
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def __len__(self) -> int:
+        if not self.shape:
+            raise TypeError("len() of unsized object")
+        return self.shape[0]
+
+    def __repr__(self) -> str:
+        return f"LazyArray({self.expression}, shape={self.shape}, dtype={self.dtype})"
+
+    def __getitem__(self, key) -> "LazyArray":
+        key = key if isinstance(key, tuple) else (key,)
+        dims = [d for d, keep in enumerate(self.keep) if keep]
+
+        if any(k is Ellipsis for k in key):
+            i = next(i for i, k in enumerate(key) if k is Ellipsis)
+            key = key[:i] + (slice(None),) * (len(dims) - len(key) + 1) + key[i + 1:]
+        if len(key) > len(dims):
+            raise IndexError(f"Too many indices: array is {len(dims)}-dimensional, but {len(key)} were given")
+
+        ranges, narrowed, keep = list(self.ranges), list(self.narrowed), list(self.keep)
+        for d, k in zip(dims, key):
+            if isinstance(k, slice):
+                if k != slice(None):
+                    ranges[d], narrowed[d] = ranges[d][k], True
+            elif isinstance(k, (int, np.integer)):
+                if not -len(ranges[d]) <= k < len(ranges[d]):
+                    raise IndexError(f"Index {k} is out of bounds for size {len(ranges[d])}")
+                k = int(k) % len(ranges[d])
+                ranges[d], narrowed[d], keep[d] = ranges[d][k:k + 1], True, False
+            else:
+                raise IndexError("Only integers, slices and ... are valid indices of a LazyArray")
+
+        return LazyArray(self.expression, self.slices, ranges, narrowed, keep, self.sizes, self.dtype,
+                         self.type_set)
+
+    def selection(self) -> List[slice]:
+        return [
+            util.range_slice(r, self.sizes[d] is not None) if self.narrowed[d] else self.slices[d]
+            for d, r in enumerate(self.ranges)
+        ]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        gdb_value = gdb.parse_and_eval(self.expression)
+        handler = self.type_set.get_handler(gdb.types.get_basic_type(gdb_value.type))
+
+        with stats.timed("extract"):
+            out = np.asarray(handler.extract_all(gdb_value, self.selection()))
+
+        full_shape = tuple(len(r) for r in self.ranges)
+        if out.shape != full_shape:
+            raise ValueError(f"{self.expression} has changed shape from {full_shape} to {out.shape}")
+        out = out.reshape(self.shape)
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.__array__(), name)
+
+
+def lazy(var: str, type_set: TypeSet = default) -> LazyArray:
+    """
+    Makes a lazy array of a variable, optionally sliced, as given to the
+    plotting and saving commands (for example "buf" or "ptr[:1000000]"),
+    without reading any of its elements
+
+    Parameters:
+    var (str): The variable, with optional slice
+    type_set (TypeSet): The type handlers to use
+
+    Returns:
+    LazyArray: The array
+    """
+    base_var, var_slice, gdb_value = data_extractor.evaluate_var(var)
+    handler = type_set.get_handler(gdb.types.get_basic_type(gdb_value.type))
+
+    shape, dtype = handler.result_layout(gdb_value, list(var_slice))
+    sizes = dimension_sizes(gdb_value, handler, type_set)
+    sizes = (sizes + [None] * len(shape))[:len(shape)]
+    slices = (list(var_slice) + [slice(None)] * len(shape))[:len(shape)]
+
+    ranges = [util.slice_range(s, n) for s, n in zip(slices, sizes)]
+    keep = [n != 1 for n in shape]
+    return LazyArray(base_var, slices, ranges, [False] * len(shape), keep, sizes, dtype, type_set)
@@ -0,0 +1,81 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from . import stats
+from . import util
+
+# Neighbouring buffers separated by at most this many bytes are read together
+MERGE_GAP = 4096
+# Reads are not merged beyond this size
+MAX_MERGED_READ = 16 * 2**20
+
+
+class ReadRequest:
+    def __init__(self, address: int, dtype: np.dtype, first: int, lo: int, hi: int,
+                 byte_strides: Tuple[int, ...], out: np.ndarray):
+        itemsize = dtype.itemsize
+        self.dtype = dtype
+        self.first = address + first * itemsize
+        self.lo = address + lo * itemsize
+        self.hi = address + hi * itemsize
+        self.byte_strides = byte_strides
+        self.out = out
+
+
+class ReadBatch:
+    """
+    Collects the reads of contiguous scalar buffers found while walking a
+    variable, so that they can be performed together. The buffers are sorted
+    by address, and neighbouring or overlapping buffers are read with a
+    single read_memory call, then scattered into their outputs
+    """
+
+    def __init__(self):
+        self.requests: List[ReadRequest] = []
+
+    def add(self, address: int, dtype: np.dtype, shape: Tuple[Optional[int], ...],
+            slices: List[slice], out: np.ndarray, strides: Optional[List[int]] = None):
+        ranges = [util.slice_range(s, n) for s, n in zip(slices, shape)]
+        out_shape = tuple(len(r) for r in ranges)
+        if 0 in out_shape:
+            return
+
+        if strides is None:
+            strides = util.element_strides(shape)
+        first, lo, hi = util.selection_span(strides, ranges)
+        if not util.is_dense(lo, hi, out.size, dtype.itemsize):
+            # Sparse selections are read in pieces of their own
+            out[...] = util.read_contiguous(address, dtype, shape, slices, strides)
+            return
+
+        byte_strides = tuple(r.step * st * dtype.itemsize for r, st in zip(ranges, strides))
+        self.requests.append(ReadRequest(address, dtype, first, lo, hi, byte_strides, out))
+
+    def execute(self):
+        group = []
+        group_lo = group_hi = 0
+        for request in sorted(self.requests, key=lambda r: r.lo):
+            if group and (request.lo > group_hi + MERGE_GAP or request.hi - group_lo > MAX_MERGED_READ):
+                self.read_group(group, group_lo, group_hi)
+                group = []
+
+            if not group:
+                group_lo, group_hi = request.lo, request.hi
+            group.append(request)
+            group_hi = max(group_hi, request.hi)
+
+        if group:
+            self.read_group(group, group_lo, group_hi)
+        self.requests = []
+
+    @staticmethod
+    def read_group(group: List[ReadRequest], lo: int, hi: int):
+        if stats.enabled:
+            stats.count("batched_requests", len(group))
+        data = util.read_array(lo, np.dtype(np.uint8), hi - lo)
+
+        for request in group:
+            view = np.ndarray(request.out.shape, request.dtype, buffer=data, offset=request.first - lo,
+                              strides=request.byte_strides)
+            request.out[...] = view
@@ -0,0 +1,45 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class Plan:
+    """
+    How values of one type are extracted, compiled once per type from the
+    layout hints of its handler (see TypeSet.get_plan).
+
+    Containers whose handler gives element_type have their elements' plan
+    in contained, so the elements' handler is not looked up for every value.
+
+    If block_shape is not None, every value of the type holds a C-contiguous
+    array of block_shape elements of dtype, starting block_offset bytes from
+    the start of the value, with no padding in between. Scalars with a dtype
+    are blocks with an empty shape, and a std::array of them is a block with
+    its own size as the shape. Containers whose elements are blocks (see
+    element_block) and are stored contiguously are read with a single
+    memory read
+    """
+
+    def __init__(self, handler, scalar: bool = False, contained_type=None, contained: "Optional[Plan]" = None,
+                 dtype: Optional[np.dtype] = None, block_shape: Optional[Tuple[int, ...]] = None,
+                 block_offset: int = 0):
+        self.handler = handler
+        self.scalar = scalar
+        self.contained_type = contained_type
+        self.contained = contained
+        self.dtype = dtype
+        self.block_shape = block_shape
+        self.block_offset = block_offset
+        self.element_block = None if contained is None else element_block(contained_type, contained)
+
+
+def element_block(contained_type, contained: Plan) -> Optional[Tuple[np.dtype, Tuple[int, ...]]]:
+    """
+    Gets the dtype and shape that the elements of a container can be read
+    as, if each element is a block that spans the whole of its type
+    """
+    if contained.block_shape is None or contained.block_offset != 0:
+        return None
+    if contained_type.sizeof != contained.dtype.itemsize * int(np.prod(contained.block_shape)):
+        return None
+    return contained.dtype, contained.block_shape
@@ -1,9 +1,16 @@
+import shutil
+import sys
+from typing import List, Tuple
+
 import gdb # pylint: disable=E0401
-import matplotlib.pyplot as plt
-import mpl_toolkits.mplot3d.axes3d as p3
 import numpy as np
 
 from . import data_extractor
+from . import decimate
+from . import spectrum
+from . import stats
+from .figures import Figure, draw
+from .renderer import Renderer
 
 
 class PlottingError(Exception):
@@ -17,68 +24,156 @@ class Legend:
     def add(self, name: str):
         self.legend.append(name)
 
-    def apply(self):
-        plt.legend(self.legend)
+    def apply(self, figure: Figure):
+        figure.legend(self.legend)
+
+
+def default_python() -> str:
+    # Inside GDB, sys.executable is not necessarily a Python interpreter
+    executable = sys.executable
+    if not executable or "gdb" in executable.rsplit("/", 1)[-1]:
+        executable = shutil.which("python3") or shutil.which("python") or ""
+    return executable
+
+
+class RendererMode(gdb.Parameter):
+    """
+    Controls whether figures are drawn in a separate renderer process. When
+    on, plotting commands return to the GDB prompt straight away, and the
+    figures stay open while the program is stepped. Extracted data is passed
+    to the renderer through shared memory
+    """
+
+    set_doc = "Set whether gdbplotlib draws figures in a separate process."
+    show_doc = "Show whether gdbplotlib draws figures in a separate process."
+
+    def __init__(self):
+        super(RendererMode, self).__init__("gdbplotlib-renderer", gdb.COMMAND_DATA, gdb.PARAM_BOOLEAN)
+        self.value = False
+
+    def get_set_string(self):
+        if not self.value:
+            renderer.stop()
+        return ""
+
+
+class RendererPython(gdb.Parameter):
+    """
+    Controls the Python interpreter used to run the renderer process. It
+    must be able to import NumPy, Matplotlib and gdbplotlib
+    """
+
+    set_doc = "Set the Python interpreter used by the gdbplotlib renderer."
+    show_doc = "Show the Python interpreter used by the gdbplotlib renderer."
+
+    def __init__(self):
+        super(RendererPython, self).__init__("gdbplotlib-python", gdb.COMMAND_DATA, gdb.PARAM_STRING)
+        self.value = default_python()
+
+    def get_set_string(self):
+        renderer.stop()
+        return ""
+
+
+renderer = Renderer()
+renderer_mode = RendererMode()
+renderer_python = RendererPython()
+
+
+def show(figure: Figure):
+    if renderer_mode.value:
+        renderer.send(figure, renderer_python.value)
+        return
+
+    import matplotlib.pyplot as plt
+
+    draw(figure)
+    # Time spent with the window open is kept out of the "plot" phase
+    with stats.timed("show"):
+        plt.show()
+
+
+def parse_options(args: str, options: dict) -> Tuple[dict, List[str]]:
+    """
+    Splits the options given as "-name value" at the start of a command's
+    arguments from the variables that follow them, converting each value
+    with options[name]. "--" ends the options
+    """
+    argv = args.split()
+    values = {}
+    while argv and argv[0].startswith("-"):
+        option = argv.pop(0)
+        if option == "--":
+            break
+        name = option[1:]
+        if name not in options or not argv:
+            raise PlottingError(f"Invalid option: {option}")
+        try:
+            values[name] = options[name](argv.pop(0))
+        except ValueError:
+            raise PlottingError(f"Invalid value for {option}")
+
+    return values, argv
+
+
+def series_1d(arg: str, data: np.ndarray) -> List[Tuple[str, np.ndarray]]:
+    if data.ndim == 2 and not np.iscomplexobj(data):
+        return [(f"{arg}[{i}]", row) for i, row in enumerate(data)]
+    elif data.ndim == 1:
+        if np.iscomplexobj(data):
+            return [(f"real({arg})", np.real(data)), (f"imag({arg})", np.imag(data)), (f"abs({arg})", np.abs(data))]
+        else:
+            return [(arg, data)]
+    else:
+        raise PlottingError(f"Unsuitable for plotting: {arg}")
 
 
 def plot_1d(args, plot_function):
+    figure = Figure()
     legend = Legend()
 
-    for arg in args.split():
-        data = data_extractor.extract_var(arg)
-
-        if data.ndim == 2 and not np.iscomplexobj(data):
-            for i, row in enumerate(data):
-                plot_function(row)
-                legend.add(f"{arg}[{i}]")
-        elif data.ndim == 1:
-            if np.iscomplexobj(data):
-                plot_function(np.real(data))
-                plot_function(np.imag(data))
-                plot_function(np.abs(data))
-                legend.add(f"real({arg})")
-                legend.add(f"imag({arg})")
-                legend.add(f"abs({arg})")
-            else:
-                plot_function(data)
-                legend.add(arg)
-        else:
-            raise PlottingError(f"Unsuitable for plotting: {arg}")
+    argv = args.split()
+    for arg, data in zip(argv, data_extractor.extract_vars(argv)):
+        for label, series in series_1d(arg, data):
+            plot_function(figure, series)
+            legend.add(label)
     
-    legend.apply()
-    plt.grid()
-    plt.show()
+    legend.apply(figure)
+    figure.grid()
+    show(figure)
 
 
 class Plot(gdb.Command):
     def __init__(self):
         super(Plot, self).__init__("plot", gdb.COMMAND_OBSCURE)
 
+    @stats.timed("plot")
     def invoke(self, args, from_tty):
-        plot_1d(args, plt.plot)
+        plot_1d(args, lambda figure, x: figure.decimated_plot(x))
 
 
 class Scatter(gdb.Command):
     def __init__(self):
         super(Scatter, self).__init__("scatter", gdb.COMMAND_OBSCURE)
 
+    @stats.timed("plot")
     def invoke(self, args, from_tty):
+        figure = Figure()
         legend = Legend()
         temp = []
 
-        for arg in args.split():
-            data = data_extractor.extract_var(arg)
-
+        argv = args.split()
+        for arg, data in zip(argv, data_extractor.extract_vars(argv)):
             if data.ndim == 2 and not np.iscomplexobj(data) and 2 in data.shape:
                 if data.shape[1] == 2:
-                    plt.scatter(data[:,0], data[:,1])
+                    figure.decimated_scatter(data[:,0], data[:,1])
                 else:
-                    plt.scatter(data[0], data[1])
+                    figure.decimated_scatter(data[0], data[1])
 
                 legend.add(arg)
             elif data.ndim == 1:
                 if np.iscomplexobj(data):
-                    plt.scatter(np.real(data), np.imag(data))
+                    figure.decimated_scatter(np.real(data), np.imag(data))
                     legend.add(arg)
                 else:
                     temp.append(data)
@@ -87,22 +182,23 @@ class Scatter(gdb.Command):
 
         if len(temp):
             if len(temp) == 2:
-                plt.scatter(temp[0], temp[1])
+                figure.decimated_scatter(temp[0], temp[1])
                 legend.add("Data")
             else:
                 raise PlottingError(f"Incorrect number of arguments")
         
-        legend.apply()
-        plt.grid()
-        plt.show()
+        legend.apply(figure)
+        figure.grid()
+        show(figure)
 
 
 class Plot3D(gdb.Command):
     def __init__(self):
         super(Plot3D, self).__init__("plot3d", gdb.COMMAND_OBSCURE)
 
+    @stats.timed("plot")
     def invoke(self, args, from_tty):
-        z = data_extractor.extract_var(args)
+        z, = data_extractor.extract_vars([args])
         if z.ndim != 2:
             raise PlottingError(f"Unsuitable for plotting: {args}")
 
@@ -110,31 +206,28 @@ class Plot3D(gdb.Command):
         y = np.arange(z.shape[0])
         xm, ym = np.meshgrid(x, y)
 
-        fig = plt.figure()
-        ax = p3.Axes3D(fig)
-        ax.plot_surface(xm, ym, z)
-        plt.show()
+        figure = Figure(projection="3d")
+        figure.plot_surface(xm, ym, z)
+        show(figure)
 
 
 class Scatter3D(gdb.Command):
     def __init__(self):
         super(Scatter3D, self).__init__("scatter3d", gdb.COMMAND_OBSCURE)
 
+    @stats.timed("plot")
     def invoke(self, args, from_tty):
+        figure = Figure(projection="3d")
         legend = Legend()
         temp = []
 
-        fig = plt.figure()
-        ax = p3.Axes3D(fig)
-
-        for arg in args.split():
-            data = data_extractor.extract_var(arg)
-
+        argv = args.split()
+        for arg, data in zip(argv, data_extractor.extract_vars(argv)):
             if data.ndim == 2 and not np.iscomplexobj(data) and 3 in data.shape:
                 if data.shape[1] == 3:
-                    ax.scatter(data[:,0], data[:,1], data[:,2])
+                    figure.scatter(data[:,0], data[:,1], data[:,2])
                 else:
-                    ax.scatter(data[0], data[1], data[2])
+                    figure.scatter(data[0], data[1], data[2])
 
                 legend.add(arg)
             elif data.ndim == 1:
@@ -144,22 +237,24 @@ class Scatter3D(gdb.Command):
 
         if len(temp):
             if len(temp) == 3:
-                ax.scatter(temp[0], temp[1])
+                figure.scatter(temp[0], temp[1], temp[2])
                 legend.add("Data")
             else:
                 raise PlottingError(f"Incorrect number of arguments")
         
-        legend.apply()
-        plt.grid()
-        plt.show()
+        legend.apply(figure)
+        figure.grid()
+        show(figure)
 
 
 class Hist(gdb.Command):
     def __init__(self):
         super(Hist, self).__init__("hist", gdb.COMMAND_OBSCURE)
 
+    @stats.timed("plot")
     def invoke(self, args, from_tty):
-        hist = lambda x: plt.hist(x, bins="auto")
+        # Only the counts are sent to be drawn, not every sample
+        hist = lambda figure, x: figure.histogram(*decimate.histogram(x, bins="auto"))
         plot_1d(args, hist)
 
 
@@ -167,27 +262,46 @@ class FFT(gdb.Command):
     def __init__(self):
         super(FFT, self).__init__("fft", gdb.COMMAND_OBSCURE)
 
+    @stats.timed("plot")
     def invoke(self, args, from_tty):
+        options, variables = parse_options(args, {"segment": int, "overlap": int, "window": str, "axis": int})
+        figure = Figure()
         legend = Legend()
-        fft_db = lambda x: 20*np.log10(np.abs(np.fft.fft(x)))
 
-        for arg in args.split():
-            data = data_extractor.extract_var(arg)
+        for arg, data in zip(variables, data_extractor.extract_vars(variables)):
+            if data.ndim not in (1, 2):
+                raise PlottingError(f"Unsuitable for plotting: {arg}")
 
-            if data.ndim == 2 and not np.iscomplexobj(data):
-                for i, row in enumerate(data):
-                    plt.plot(fft_db(row))
-                    legend.add(f"{arg}[{i}]")
-            elif data.ndim == 1:
-                plt.plot(fft_db(data))
+            # The series of 2D variables are its rows, unless -axis 0 is given
+            axis = options.get("axis", -1) if data.ndim == 2 else -1
+            if axis not in (-2, -1, 0, 1):
+                raise PlottingError("Invalid value for -axis")
+            try:
+                if "segment" in options:
+                    segment = options["segment"]
+                    frequencies, psd = spectrum.welch(data, segment, options.get("overlap", segment // 2),
+                                                      options.get("window", "hann"), axis)
+                else:
+                    frequencies, psd = spectrum.periodogram(data, options.get("window", "rectangular"), axis)
+            except spectrum.SpectrumError as e:
+                raise PlottingError(f"{arg}: {e}")
+
+            with np.errstate(divide="ignore"):
+                psd_db = 10 * np.log10(psd)
+
+            if psd_db.ndim == 1:
+                figure.decimated_plot(frequencies, psd_db)
                 legend.add(arg)
             else:
-                raise PlottingError(f"Unsuitable for plotting: {arg}")
-
-        legend.apply()
-        plt.grid()
-        plt.ylabel("PSD (dB)")
-        plt.show()
+                for i, row in enumerate(psd_db):
+                    figure.decimated_plot(frequencies, row)
+                    legend.add(f"{arg}[:,{i}]" if axis in (0, -2) else f"{arg}[{i}]")
+
+        legend.apply(figure)
+        figure.grid()
+        figure.set_xlabel("Frequency (cycles/sample)")
+        figure.set_ylabel("PSD (dB)")
+        show(figure)
 
 
 Plot()
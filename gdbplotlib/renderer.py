@@ -0,0 +1,127 @@
+import multiprocessing
+import traceback
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .figures import Figure, draw
+
+
+class SharedArray:
+    """
+    Reference to an array held in shared memory. Only this descriptor is
+    pickled when a figure is sent to the renderer, never the array data
+    """
+
+    def __init__(self, name: str, shape: Tuple[int, ...], dtype: np.dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+
+def create_shared_memory(size: int) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    except TypeError:
+        # Before Python 3.13 the segment cannot be created untracked, and would
+        # be unlinked again when GDB exits, despite belonging to the renderer
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def share(array: np.ndarray) -> SharedArray:
+    shm = create_shared_memory(max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    shared = SharedArray(shm.name, array.shape, array.dtype)
+    shm.close()
+    return shared
+
+
+def unshare(shared: SharedArray) -> np.ndarray:
+    shm = shared_memory.SharedMemory(name=shared.name)
+    array = np.ndarray(shared.shape, shared.dtype, buffer=shm.buf).copy()
+    shm.close()
+    shm.unlink()
+    return array
+
+
+def main(connection):
+    import matplotlib.pyplot as plt
+
+    plt.ion()
+    while True:
+        # Block until the next figure arrives, unless there are open figures
+        # whose event loop needs to keep running
+        timeout = 0.05 if plt.get_fignums() else None
+        try:
+            if connection.poll(timeout):
+                figure = connection.recv()
+                if figure is None:
+                    break
+
+                figure.map_arrays(unshare, SharedArray)
+                draw(figure)
+                plt.show(block=False)
+        except (EOFError, OSError):
+            break
+        except Exception:
+            traceback.print_exc()
+
+        if plt.get_fignums():
+            plt.pause(0.05)
+
+
+class Renderer:
+    """
+    Long-lived process that draws figures, so that plotting commands do not
+    block GDB until their windows are closed
+    """
+
+    def __init__(self):
+        self.process = None
+        self.connection = None
+
+    def running(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, python: Optional[str] = None):
+        context = multiprocessing.get_context("spawn")
+        if python:
+            context.set_executable(python)
+
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=main, args=(child_connection,), name="gdbplotlib-renderer",
+                                       daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def stop(self):
+        if self.running():
+            try:
+                self.connection.send(None)
+            except OSError:
+                pass
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.terminate()
+
+        if self.connection is not None:
+            self.connection.close()
+        self.process = None
+        self.connection = None
+
+    def send(self, figure: Figure, python: Optional[str] = None):
+        if not self.running():
+            self.stop()
+            self.start(python)
+
+        figure.map_arrays(share)
+        try:
+            self.connection.send(figure)
+        except OSError:
+            for shared in figure.arrays(SharedArray):
+                shared_memory.SharedMemory(name=shared.name).unlink()
+            self.stop()
+            raise
@@ -1,58 +1,242 @@
+import importlib.util
+import json
+import os
 import pickle
+import tempfile
+import zipfile
+from typing import List, Tuple
 
 import gdb  # pylint: disable=E0401
+import numpy as np
 
 from . import data_extractor
+from . import stats
 from . import util
 
-try:
-    import scipy.io
-    SCIPY_AVAILABLE = True
-except ImportError:
-    SCIPY_AVAILABLE = False
+# SciPy and h5py are slow to import, so they are only imported by the
+# commands that use them
+SCIPY_AVAILABLE = importlib.util.find_spec("scipy") is not None
+H5PY_AVAILABLE = importlib.util.find_spec("h5py") is not None
+
+PROGRESS_MIN_BYTES = 256 * 2**20
+
+
+def variable_names(variables: List[str]) -> List[str]:
+    names = []
+    for v in variables:
+        base_var, _ = util.split_variable_and_slice(v)
+        name = util.strip_non_alphanumeric(base_var) or "var"
+        unique_name, i = name, 2
+        while unique_name in names:
+            unique_name, i = f"{name}_{i}", i + 1
+        names.append(unique_name)
+
+    return names
+
+
+def parse_files_and_variables(args: str, usage: str) -> Tuple[str, List[str]]:
+    argv = args.split()
+    if len(argv) < 2:
+        raise gdb.GdbError(f"Usage: {usage}")
+    return argv[0], argv[1:]
+
+
+def metadata(var: str, shape: Tuple[int, ...], dtype: np.dtype) -> dict:
+    return {"expression": var, "dtype": dtype.str, "shape": list(shape)}
 
 
 class SaveMat(gdb.Command):
     def __init__(self):
         super(SaveMat, self).__init__("savemat", gdb.COMMAND_OBSCURE)
 
+    @stats.timed("save")
     def invoke(self, args, from_tty):
         if not SCIPY_AVAILABLE:
             raise RuntimeError("Scipy not available")
+        import scipy.io
 
         out = {}
-        filename, var = args.split()
+        filename, *variables = args.split()
 
-        for v in var:
-            data = data_extractor.extract_var(v)
-            base_var, _ = util.split_variable_and_slice(v)
-            dict_name = util.strip_non_alphanumeric(base_var)
+        for dict_name, data in zip(variable_names(variables), data_extractor.extract_vars(variables)):
             out[dict_name] = data
 
         scipy.io.savemat(filename, out)
 
 
+class Progress:
+    """
+    Reports the progress of saving a large variable, every 10%
+    """
+
+    def __init__(self, var: str, total_bytes: int):
+        self.var = var
+        self.total_bytes = total_bytes
+        self.done_bytes = 0
+        self.reported = 0
+        self.enabled = total_bytes > PROGRESS_MIN_BYTES
+
+    def update(self, n_bytes: int):
+        self.done_bytes += n_bytes
+        percent = 100 * self.done_bytes // max(self.total_bytes, 1)
+        if self.enabled and percent // 10 > self.reported // 10:
+            self.reported = percent
+            gdb.write(f"{self.var}: {percent}% ({self.done_bytes >> 20}/{self.total_bytes >> 20} MiB)\n")
+            gdb.flush()
+
+
+def stream_chunks(var: str, write):
+    """
+    Extracts a variable chunk by chunk, passing each chunk to write, and
+    returns the shape and dtype of the whole variable
+    """
+    shape, dtype, chunks = data_extractor.extract_var_chunks(var)
+    progress = Progress(var, int(np.prod(shape)) * dtype.itemsize)
+
+    for offset, chunk in chunks:
+        write(offset, chunk)
+        progress.update(chunk.nbytes)
+
+    return shape, dtype
+
+
+def stream_to_npy(filename: str, var: str):
+    shape, dtype, chunks = data_extractor.extract_var_chunks(var)
+    out = np.lib.format.open_memmap(filename, mode="w+", dtype=dtype, shape=shape)
+    flat = out.reshape(-1)
+    progress = Progress(var, out.nbytes)
+
+    for offset, chunk in chunks:
+        flat[offset:offset + chunk.size] = chunk.reshape(-1)
+        progress.update(chunk.nbytes)
+
+    out.flush()
+    return out
+
+
+def write_npy_header(file, shape: Tuple[int, ...], dtype: np.dtype):
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape}
+    try:
+        np.lib.format.write_array_header_1_0(file, header)
+    except ValueError:
+        np.lib.format.write_array_header_2_0(file, header)
+
+
 class SavePy(gdb.Command):
     def __init__(self):
         super(SavePy, self).__init__("savepy", gdb.COMMAND_OBSCURE)
 
+    @stats.timed("save")
     def invoke(self, args, from_tty):
         filename, var = args.split()
-        data = data_extractor.extract_var(var)
-        with open(filename, "wb") as file:
-            pickle.dump(data, file)
+
+        # The variable is streamed to a memory-mapped temporary file, which is
+        # then pickled straight from the mapping
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, temp_filename = tempfile.mkstemp(suffix=".npy", dir=directory)
+        os.close(fd)
+        try:
+            data = stream_to_npy(temp_filename, var)
+            with open(filename, "wb") as file:
+                pickle.dump(np.asarray(data), file, protocol=5)
+            del data
+        finally:
+            os.remove(temp_filename)
+
+
+class SaveNpy(gdb.Command):
+    def __init__(self):
+        super(SaveNpy, self).__init__("savenpy", gdb.COMMAND_OBSCURE)
+
+    @stats.timed("save")
+    def invoke(self, args, from_tty):
+        directory, variables = parse_files_and_variables(args, "savenpy DIRECTORY VAR...")
+        os.makedirs(directory, exist_ok=True)
+
+        index = {}
+        for v, name in zip(variables, variable_names(variables)):
+            data = stream_to_npy(os.path.join(directory, f"{name}.npy"), v)
+            index[name] = metadata(v, data.shape, data.dtype)
+            del data
+
+        with open(os.path.join(directory, "metadata.json"), "w") as file:
+            json.dump(index, file, indent=2)
+
+
+class SaveZ(gdb.Command):
+    def __init__(self):
+        super(SaveZ, self).__init__("savez", gdb.COMMAND_OBSCURE)
+
+    @stats.timed("save")
+    def invoke(self, args, from_tty):
+        filename, variables = parse_files_and_variables(args, "savez FILE VAR...")
+
+        index = {}
+        with zipfile.ZipFile(filename, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for v, name in zip(variables, variable_names(variables)):
+                shape, dtype, chunks = data_extractor.extract_var_chunks(v)
+                progress = Progress(v, int(np.prod(shape)) * dtype.itemsize)
+
+                with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                    write_npy_header(member, shape, dtype)
+                    for _, chunk in chunks:
+                        member.write(np.ascontiguousarray(chunk).data)
+                        progress.update(chunk.nbytes)
+
+                index[name] = metadata(v, shape, dtype)
+
+            # Stored as a string array, so that it can be loaded without pickle
+            with archive.open("__metadata__.npy", "w") as member:
+                np.lib.format.write_array(member, np.array(json.dumps(index)))
+
+
+class SaveHDF5(gdb.Command):
+    def __init__(self):
+        super(SaveHDF5, self).__init__("savehdf5", gdb.COMMAND_OBSCURE)
+
+    @stats.timed("save")
+    def invoke(self, args, from_tty):
+        if not H5PY_AVAILABLE:
+            raise RuntimeError("h5py not available")
+        import h5py
+
+        filename, variables = parse_files_and_variables(args, "savehdf5 FILE VAR...")
+
+        with h5py.File(filename, "w") as file:
+            for v, name in zip(variables, variable_names(variables)):
+                shape, dtype, chunks = data_extractor.extract_var_chunks(v)
+                dataset = file.create_dataset(
+                    name, shape=shape, dtype=dtype, chunks=True if shape else None,
+                    compression="gzip" if shape else None, shuffle=bool(shape)
+                )
+                dataset.attrs["expression"] = v
+
+                progress = Progress(v, int(np.prod(shape)) * dtype.itemsize)
+                row_size = int(np.prod(shape[1:]))
+                for offset, chunk in chunks:
+                    if shape:
+                        # Chunks are whole rows of the first (non-unit) dimension
+                        rows = chunk.reshape((-1, *shape[1:]))
+                        dataset[offset // row_size:offset // row_size + len(rows)] = rows
+                    else:
+                        dataset[()] = chunk.reshape(())
+                    progress.update(chunk.nbytes)
 
 
 class Save(gdb.Command):
     def __init__(self):
         super(Save, self).__init__("save", gdb.COMMAND_OBSCURE)
 
+    @stats.timed("save")
     def invoke(self, args, from_tty):
         filename, var = args.split()
-        data = data_extractor.extract_var(var)
-        data.tofile(filename)
+        with open(filename, "wb") as file:
+            stream_chunks(var, lambda offset, chunk: chunk.tofile(file))
 
 
 SaveMat()
 SavePy()
+SaveNpy()
+SaveZ()
+SaveHDF5()
 Save()
\ No newline at end of file
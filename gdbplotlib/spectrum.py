@@ -0,0 +1,101 @@
+from typing import Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Welch's method transforms this many bytes worth of segments at a time
+WELCH_BLOCK_BYTES = 64 * 2**20
+
+WINDOWS = {
+    "hann": np.hanning,
+    "hamming": np.hamming,
+    "blackman": np.blackman,
+    "bartlett": np.bartlett,
+    "rectangular": np.ones,
+}
+
+
+class SpectrumError(Exception):
+    pass
+
+
+def frequencies(n: int, one_sided: bool) -> np.ndarray:
+    """
+    Gets the frequencies, in cycles per sample, of the bins of a spectrum of
+    n samples, in increasing order
+    """
+    return np.fft.rfftfreq(n) if one_sided else np.fft.fftshift(np.fft.fftfreq(n))
+
+
+def power(data: np.ndarray, window: np.ndarray) -> np.ndarray:
+    """
+    Gets the power spectral density of every series along the last axis of
+    data, after multiplying them by window. Real series are transformed with
+    rfft, and their power is folded into the positive frequencies
+    """
+    if np.iscomplexobj(data):
+        spectrum = np.fft.fftshift(np.fft.fft(data * window, axis=-1), axes=-1)
+        return np.abs(spectrum) ** 2 / np.sum(window ** 2)
+
+    psd = np.abs(np.fft.rfft(data * window, axis=-1)) ** 2 / np.sum(window ** 2)
+    # Every frequency but 0 and the Nyquist frequency also has a negative twin
+    psd[..., 1:(window.size + 1) // 2] *= 2
+    return psd
+
+
+def periodogram(data: np.ndarray, window: str = "rectangular", axis: int = -1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the power spectral density of each series of data along axis,
+    windowed as a whole, in a single batched FFT (see welch). The mean is
+    not subtracted, so the density at frequency 0 is kept
+    """
+    return welch(data, np.shape(data)[axis], 0, window, axis, detrend=False)
+
+
+def welch(data: np.ndarray, segment: int, overlap: int, window: str = "hann",
+          axis: int = -1, detrend: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Estimates the power spectral density of each series of data along axis
+    with Welch's method: the average of the periodograms of overlapping,
+    windowed segments. The segments are transformed a block at a time, so the
+    memory used does not grow with the length of the series. As with the
+    defaults of scipy.signal.welch, the mean of each segment is subtracted
+    before it is windowed
+
+    Parameters:
+    data (np.ndarray): The series
+    segment (int): The length of each segment
+    overlap (int): The number of samples shared by consecutive segments
+    window (str): The name of the window applied to each segment (see WINDOWS)
+    axis (int): The axis of data along which the series lie
+    detrend (bool): Whether to subtract the mean of each segment
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray]: The frequencies, in cycles per sample, and
+                                   the densities, with the frequency axis last
+    """
+    data = np.moveaxis(np.asarray(data), axis, -1)
+    n = data.shape[-1]
+    if window not in WINDOWS:
+        raise SpectrumError(f"Unknown window: {window} (expected one of {', '.join(WINDOWS)})")
+    if not 0 < segment <= n:
+        raise SpectrumError(f"Segment length must be between 1 and the number of samples ({n})")
+    if not 0 <= overlap < segment:
+        raise SpectrumError("Overlap must be at least 0 and less than the segment length")
+
+    # The periodic form of the window, as is usual for spectral analysis
+    taper = WINDOWS[window](segment + 1)[:-1]
+    # A view of every segment, which is only copied a block at a time
+    segments = sliding_window_view(data, segment, axis=-1)[..., ::segment - overlap, :]
+    n_segments = segments.shape[-2]
+    series_bytes = int(np.prod(data.shape[:-1])) * segment * 16
+    block = max(1, WELCH_BLOCK_BYTES // max(series_bytes, 1))
+
+    total = 0
+    for start in range(0, n_segments, block):
+        chunk = segments[..., start:start + block, :]
+        if detrend:
+            chunk = chunk - chunk.mean(axis=-1, keepdims=True)
+        total = total + power(chunk, taper).sum(axis=-2)
+
+    return frequencies(segment, not np.iscomplexobj(data)), total / n_segments
@@ -0,0 +1,83 @@
+import json
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+import gdb  # pylint: disable=E0401
+
+enabled = False
+counters = Counter()
+timers = defaultdict(float)
+_timer_stack = []
+
+
+def count(name: str, n: int = 1):
+    counters[name] += n
+
+
+@contextmanager
+def timed(phase: str):
+    """
+    Times a phase of a command. Nested phases are excluded from the time of
+    the enclosing phase, so that the times of all phases add up to the total
+    """
+    if not enabled:
+        yield
+        return
+
+    _timer_stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        children = _timer_stack.pop()
+        timers[phase] += elapsed - children
+        if _timer_stack:
+            _timer_stack[-1] += elapsed
+
+
+def reset():
+    counters.clear()
+    timers.clear()
+
+
+def as_dict() -> dict:
+    return {"enabled": enabled, "counters": dict(counters), "timers": dict(timers)}
+
+
+class Stats(gdb.Command):
+    """
+    Show gdbplotlib extraction statistics.
+    Usage: gdbplotlib-stats [on|off|reset|json FILE]
+    """
+
+    def __init__(self):
+        super(Stats, self).__init__("gdbplotlib-stats", gdb.COMMAND_OBSCURE)
+
+    def invoke(self, args, from_tty):
+        global enabled
+        argv = args.split()
+
+        if not argv:
+            self.show()
+        elif argv[0] in ("on", "off"):
+            enabled = (argv[0] == "on")
+        elif argv[0] == "reset":
+            reset()
+        elif argv[0] == "json" and len(argv) == 2:
+            with open(argv[1], "w") as file:
+                json.dump(as_dict(), file, indent=2)
+        else:
+            raise gdb.GdbError("Usage: gdbplotlib-stats [on|off|reset|json FILE]")
+
+    @staticmethod
+    def show():
+        gdb.write(f"Statistics collection is {'on' if enabled else 'off'}\n")
+        for name, value in sorted(counters.items()):
+            gdb.write(f"  {name:<24} {value}\n")
+        for phase, seconds in sorted(timers.items(), key=lambda x: -x[1]):
+            gdb.write(f"  {phase:<24} {seconds:.6f} s\n")
+
+
+Stats()
@@ -1,16 +1,24 @@
 import re
-from typing import Tuple, Optional
+from abc import abstractmethod
+from typing import List, Tuple, Optional
 
 import gdb  # pylint: disable=E0401
 import gdb.types  # pylint: disable=E0401
 import numpy as np
 
-from .type_handler import TypeHandler, ScalarTypeHandler
+from .memory import ReadBatch
+from .plan import element_block
+from .type_handler import TypeHandler, ScalarTypeHandler, JaggedDataError
+from .type_set import UnkownTypeError
+from . import util
 
 COMPLEX_REGEX = re.compile("(\\S*) . (\\S*)i")
 
 
 class StdVector(TypeHandler):
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+    name_prefixes = ("std::vector",)
+
     @staticmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
         return str(gdb_type).startswith("std::vector") and str(gdb_type.template_argument(0)) != "bool"
@@ -22,34 +30,72 @@ class StdVector(TypeHandler):
     def contained_type(self, gdb_value: gdb.Value) -> gdb.Type:
         return gdb_value.type.template_argument(0)
 
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        return gdb_type.template_argument(0)
+
+    def data_address(self, gdb_value: gdb.Value) -> Optional[int]:
+        return int(gdb_value["_M_impl"]["_M_start"])
+
     def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
         return (gdb_value["_M_impl"]["_M_start"] + index[0]).dereference()
 
 
 class StdVectorBool(TypeHandler):
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+    name_prefixes = ("std::vector",)
+
     @staticmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
         return str(gdb_type).startswith("std::vector") and str(gdb_type.template_argument(0)) == "bool"
 
+    @staticmethod
+    def word_bits(gdb_value: gdb.Value) -> int:
+        return 8 * gdb_value["_M_impl"]["_M_start"]["_M_p"].type.target().sizeof
+
     def shape(self, gdb_value: gdb.Value) -> Tuple[Optional[int], ...]:
         base_size = int(gdb_value["_M_impl"]["_M_finish"]["_M_p"] - gdb_value["_M_impl"]["_M_start"]["_M_p"])
-        size = 64 * base_size + int(gdb_value["_M_impl"]["_M_finish"]["_M_offset"])
-        print(size)
+        size = self.word_bits(gdb_value) * base_size + int(gdb_value["_M_impl"]["_M_finish"]["_M_offset"])
         return (size,)
 
     def contained_type(self, gdb_value: gdb.Value) -> gdb.Type:
         return gdb_value.type.template_argument(0)
 
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        return gdb_type.template_argument(0)
+
     def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
-        container_index = index[0]//64
-        offset = index[0] % 64
-        b64 = int((gdb_value["_M_impl"]["_M_start"]["_M_p"] + container_index).dereference())
-        value = bool(b64 & (1 << offset))
+        bits = self.word_bits(gdb_value)
+        container_index = index[0] // bits
+        offset = index[0] % bits
+        word = int((gdb_value["_M_impl"]["_M_start"]["_M_p"] + container_index).dereference())
+        value = bool(word & (1 << offset))
 
         return gdb.Value(value)
 
+    def result_layout(self, gdb_value: gdb.Value, slices: List[slice]) -> Tuple[Tuple[int, ...], np.dtype]:
+        r = util.slice_range(slices[0] if slices else slice(None), self.shape(gdb_value)[0])
+        return (len(r),), np.dtype(bool)
+
+    def extract_into(self, gdb_value: gdb.Value, slices: List[slice], out: np.ndarray,
+                     batch: Optional[ReadBatch] = None):
+        r = util.slice_range(slices[0] if slices else slice(None), self.shape(gdb_value)[0])
+        if not r:
+            return
+
+        # Read every word spanned by the selection, and unpack all of its bits at once
+        bits = self.word_bits(gdb_value)
+        first_word = min(r[0], r[-1]) // bits
+        last_word = max(r[0], r[-1]) // bits
+        address = int(gdb_value["_M_impl"]["_M_start"]["_M_p"]) + first_word * bits // 8
+        words = util.read_array(address, np.dtype(np.uint8), (last_word - first_word + 1) * bits // 8)
+        unpacked = np.unpackbits(words, bitorder="little").view(bool)
+        out[...] = unpacked[r[0] - first_word * bits::r.step][:len(r)]
+
 
 class StdArray(TypeHandler):
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+    name_prefixes = ("std::array",)
+
     @staticmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
         return str(gdb_type).startswith("std::array")
@@ -61,11 +107,26 @@ class StdArray(TypeHandler):
     def contained_type(self, gdb_value: gdb.Value) -> Optional[gdb.Type]:
         return gdb_value.type.template_argument(0)
 
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        return gdb_type.template_argument(0)
+
+    def fixed_layout(self, gdb_type: gdb.Type) -> Optional[Tuple[int, Tuple[int, ...]]]:
+        for field in gdb_type.fields():
+            if field.name == "_M_elems":
+                return field.bitpos // 8, (int(gdb_type.template_argument(1)),)
+        return None
+
+    def data_address(self, gdb_value: gdb.Value) -> Optional[int]:
+        address = gdb_value["_M_elems"].address
+        return None if address is None else int(address)
+
     def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
         return gdb_value["_M_elems"][index[0]]
 
 
 class Pointer(TypeHandler):
+    type_codes = (gdb.TYPE_CODE_PTR,)
+
     @staticmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
         return gdb_type.code == gdb.TYPE_CODE_PTR
@@ -76,11 +137,19 @@ class Pointer(TypeHandler):
     def contained_type(self, gdb_value: gdb.Value) -> Optional[gdb.Type]:
         return gdb_value.type.target()
 
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        return gdb_type.target()
+
+    def data_address(self, gdb_value: gdb.Value) -> Optional[int]:
+        return int(gdb_value)
+
     def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
         return gdb_value[index[0]]
 
 
 class Array(TypeHandler):
+    type_codes = (gdb.TYPE_CODE_ARRAY,)
+
     @staticmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
         return gdb_type.code == gdb.TYPE_CODE_ARRAY
@@ -92,54 +161,97 @@ class Array(TypeHandler):
     def contained_type(self, gdb_value: gdb.Value) -> Optional[gdb.Type]:
         return gdb_value.type.target()
 
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        return gdb_type.target()
+
+    def fixed_layout(self, gdb_type: gdb.Type) -> Optional[Tuple[int, Tuple[int, ...]]]:
+        return 0, (gdb_type.range()[1] + 1,)
+
+    def data_address(self, gdb_value: gdb.Value) -> Optional[int]:
+        address = gdb_value.address
+        return None if address is None else int(address)
+
     def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
         return gdb_value[index[0]]
 
 
 class Double(ScalarTypeHandler):
+    type_codes = (gdb.TYPE_CODE_FLT,)
+
     @staticmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
         return str(gdb_type) == "double"
 
+    def dtype(self, gdb_type: gdb.Type) -> Optional[np.dtype]:
+        return util.scalar_dtype(gdb_type)
+
     def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
         return np.float64(gdb_value)
 
 
 class Float(ScalarTypeHandler):
+    type_codes = (gdb.TYPE_CODE_FLT,)
+
     @staticmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
         return str(gdb_type) == "float"
 
+    def dtype(self, gdb_type: gdb.Type) -> Optional[np.dtype]:
+        return util.scalar_dtype(gdb_type)
+
     def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
         return np.float32(gdb_value)
 
 
-def extract_complex(gdb_value) -> complex:
+def complex_dtype(gdb_type: gdb.Type, dtype: np.dtype) -> Optional[np.dtype]:
+    return dtype if gdb_type.sizeof == dtype.itemsize else None
+
+
+def extract_complex(gdb_value: gdb.Value, dtype: np.dtype):
+    address = gdb_value.address
+    if address is not None:
+        return util.read_array(int(address), dtype, 1)[0]
+
+    # Values that do not live in inferior memory fall back to parsing GDB's output
     complex_str = str(gdb_value["_M_value"])
     complex_match = COMPLEX_REGEX.search(complex_str)
     real, imag = complex_match.group(1), complex_match.group(2)
-    return float(real) + 1j * float(imag)
+    return dtype.type(float(real) + 1j * float(imag))
 
 
 class StdComplexDouble(ScalarTypeHandler):
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+    name_prefixes = ("std::complex",)
+
     @staticmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
         return str(gdb_type) == "std::complex<double>"
 
+    def dtype(self, gdb_type: gdb.Type) -> Optional[np.dtype]:
+        return complex_dtype(gdb_type, np.dtype(np.complex128))
+
     def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
-        return np.complex128(extract_complex(gdb_value))
+        return extract_complex(gdb_value, np.dtype(np.complex128))
 
 
 class StdComplexFloat(ScalarTypeHandler):
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+    name_prefixes = ("std::complex",)
+
     @staticmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
         return str(gdb_type) == "std::complex<float>"
 
+    def dtype(self, gdb_type: gdb.Type) -> Optional[np.dtype]:
+        return complex_dtype(gdb_type, np.dtype(np.complex64))
+
     def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
-        return np.complex64(extract_complex(gdb_value))
+        return extract_complex(gdb_value, np.dtype(np.complex64))
 
 
 class Integral(ScalarTypeHandler):
+    type_codes = (gdb.TYPE_CODE_INT, gdb.TYPE_CODE_CHAR)
+
     @staticmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
         return str(gdb_type) in (
@@ -147,32 +259,357 @@ class Integral(ScalarTypeHandler):
             "unsigned char", "unsigned short", "unsigned int", "unsigned long", "unsigned long long"
         )
 
-    def shape(self, gdb_value: gdb.Value) -> Tuple[Optional[int], ...]:
-        return ()
-
-    def contained_type(self, gdb_value: gdb.Value) -> Optional[gdb.Type]:
-        dtype = str(gdb.types.get_basic_type(gdb_value.type))
-        prefix = "u" if "unsigned" in dtype else "i"
-        if "char" in dtype:
-            size = "1"
-        elif "short" in dtype:
-            size = "2"
-        elif "int" in dtype:
-            size = "4"
-        else:
-            size = "8"
-
-        self.np_dtype = np.dtype(prefix + size)
-        return None
+    def dtype(self, gdb_type: gdb.Type) -> Optional[np.dtype]:
+        return util.scalar_dtype(gdb_type)
 
     def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
-        return self.np_dtype.type(gdb_value)
+        # The dtype comes from the type's size, which varies between platforms
+        return self.get_plan(gdb_value).dtype.type(gdb_value)
 
 
 class Bool(ScalarTypeHandler):
+    type_codes = (gdb.TYPE_CODE_BOOL,)
+
     @staticmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
         return str(gdb_type) == "bool"
 
+    def dtype(self, gdb_type: gdb.Type) -> Optional[np.dtype]:
+        return util.scalar_dtype(gdb_type)
+
+    def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
+        return np.bool(gdb_value)
+
+# Upper bound on the length of linked lists, so that a corrupt list cannot
+# be followed forever
+MAX_NODES = 2**28
+
+
+def pointer_size(gdb_value: gdb.Value) -> int:
+    return gdb_value.type.strip_typedefs().sizeof
+
+
+def node_value_offset(header_size: int, value_type: gdb.Type) -> int:
+    # Nodes hold their links first, followed by the (aligned) value
+    align = util.alignof(value_type)
+    return -(-header_size // align) * align
+
+
+def select_nodes(nodes: List[int], r: range, value_offset: int) -> np.ndarray:
+    return np.array([nodes[i] + value_offset for i in r], np.uint64)
+
+
+class NodeContainer(TypeHandler):
+    """
+    Base of 1-dimensional containers whose elements are not stored
+    contiguously, but whose addresses can be found (from a table of blocks,
+    or by following the links between nodes) by reading memory directly,
+    rather than through a gdb.Value per element. Runs of elements that are
+    next to each other in memory are then read together
+    """
+
+    @abstractmethod
+    def element_addresses(self, gdb_value: gdb.Value, r: range) -> np.ndarray:
+        """
+        Gets the addresses of the selected elements, in the order selected
+        """
+        pass
+
+    def contained_type(self, gdb_value: gdb.Value) -> gdb.Type:
+        return self.element_type(gdb_value.type)
+
+    def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
+        address = int(self.element_addresses(gdb_value, range(index[0], index[0] + 1))[0])
+        pointer_type = self.contained_type(gdb_value).pointer()
+        return gdb.Value(address).cast(pointer_type).dereference()
+
+    def extract_into(self, gdb_value: gdb.Value, slices: List[slice], out: np.ndarray,
+                     batch: Optional[ReadBatch] = None):
+        _, ranges, _, contained_type, contained_handler, contained_slices, block = self._layout(gdb_value, slices)
+        if out.shape[:1] != (len(ranges[0]),):
+            raise JaggedDataError(f"Inconsistent element shapes: {out.shape} and {(len(ranges[0]),)}")
+        if not ranges[0]:
+            return
+
+        addresses = self.element_addresses(gdb_value, ranges[0])
+        own_batch = batch is None
+        if own_batch:
+            batch = ReadBatch()
+        self._extract_at(addresses, contained_type, contained_handler, contained_slices, block, out, batch)
+        if own_batch:
+            batch.execute()
+
+
+class StdDeque(NodeContainer):
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+    name_prefixes = ("std::deque",)
+
+    @staticmethod
+    def can_handle(gdb_type: gdb.Type) -> bool:
+        return str(gdb_type).startswith("std::deque<")
+
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        return gdb_type.template_argument(0)
+
+    def shape(self, gdb_value: gdb.Value) -> Tuple[Optional[int], ...]:
+        start, finish = gdb_value["_M_impl"]["_M_start"], gdb_value["_M_impl"]["_M_finish"]
+        buffer_size = int(start["_M_last"] - start["_M_first"])
+        size = (
+            buffer_size * int(finish["_M_node"] - start["_M_node"] - 1)
+            + int(finish["_M_cur"] - finish["_M_first"]) + int(start["_M_last"] - start["_M_cur"])
+        )
+        return (size,)
+
+    def element_addresses(self, gdb_value: gdb.Value, r: range) -> np.ndarray:
+        start, finish = gdb_value["_M_impl"]["_M_start"], gdb_value["_M_impl"]["_M_finish"]
+        element_size = self.contained_type(gdb_value).sizeof
+        buffer_size = int(start["_M_last"] - start["_M_first"])
+        first_offset = int(start["_M_cur"] - start["_M_first"])
+
+        # The table of pointers to the blocks in use is read in one go
+        n_blocks = int(finish["_M_node"] - start["_M_node"]) + 1
+        block_dtype = np.dtype(f"u{pointer_size(start['_M_cur'])}")
+        blocks = util.read_array(int(start["_M_node"]), block_dtype, n_blocks).astype(np.uint64)
+
+        positions = np.asarray(r, np.int64) + first_offset
+        return blocks[positions // buffer_size] + (positions % buffer_size * element_size).astype(np.uint64)
+
+
+class StdList(NodeContainer):
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+    name_prefixes = ("std::list", "std::__cxx11::list")
+
+    @staticmethod
+    def can_handle(gdb_type: gdb.Type) -> bool:
+        return str(gdb_type).startswith(("std::list<", "std::__cxx11::list<"))
+
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        return gdb_type.template_argument(0)
+
+    def nodes(self, gdb_value: gdb.Value, limit: int) -> List[int]:
+        head = gdb_value["_M_impl"]["_M_node"]
+        first = head["_M_next"]
+        return util.follow_links(int(first), 0, int(head.address), pointer_size(first), limit)
+
+    def shape(self, gdb_value: gdb.Value) -> Tuple[Optional[int], ...]:
+        head = gdb_value["_M_impl"]["_M_node"]
+        if gdb.types.has_field(head.type.strip_typedefs(), "_M_size"):
+            return (int(head["_M_size"]),)
+        # Before GCC 7, the size of a list is not stored
+        return (len(self.nodes(gdb_value, MAX_NODES)),)
+
+    def element_addresses(self, gdb_value: gdb.Value, r: range) -> np.ndarray:
+        first = gdb_value["_M_impl"]["_M_node"]["_M_next"]
+        nodes = self.nodes(gdb_value, max(r[0], r[-1]) + 1)
+        return select_nodes(nodes, r, node_value_offset(2 * pointer_size(first), self.contained_type(gdb_value)))
+
+
+class StdForwardList(NodeContainer):
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+    name_prefixes = ("std::forward_list",)
+
+    @staticmethod
+    def can_handle(gdb_type: gdb.Type) -> bool:
+        return str(gdb_type).startswith("std::forward_list<")
+
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        return gdb_type.template_argument(0)
+
+    def nodes(self, gdb_value: gdb.Value, limit: int) -> List[int]:
+        first = gdb_value["_M_impl"]["_M_head"]["_M_next"]
+        return util.follow_links(int(first), 0, 0, pointer_size(first), limit)
+
+    def shape(self, gdb_value: gdb.Value) -> Tuple[Optional[int], ...]:
+        # The size of a forward_list is not stored, so the list is walked
+        # (its nodes are then in the page cache for the extraction itself)
+        return (len(self.nodes(gdb_value, MAX_NODES)),)
+
+    def element_addresses(self, gdb_value: gdb.Value, r: range) -> np.ndarray:
+        first = gdb_value["_M_impl"]["_M_head"]["_M_next"]
+        nodes = self.nodes(gdb_value, max(r[0], r[-1]) + 1)
+        return select_nodes(nodes, r, node_value_offset(pointer_size(first), self.contained_type(gdb_value)))
+
+
+class StdMap(NodeContainer):
+    """
+    std::map, as an array of its std::pair elements in key order. Since the
+    pairs are structs, the keys and values are the parallel arrays m.first
+    and m.second
+    """
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+    name_prefixes = ("std::map",)
+
+    @staticmethod
+    def can_handle(gdb_type: gdb.Type) -> bool:
+        return str(gdb_type).startswith("std::map<")
+
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        # std::pair<const Key, T>, from the allocator
+        return gdb_type.template_argument(3).template_argument(0)
+
+    def shape(self, gdb_value: gdb.Value) -> Tuple[Optional[int], ...]:
+        return (int(gdb_value["_M_t"]["_M_impl"]["_M_node_count"]),)
+
+    def element_addresses(self, gdb_value: gdb.Value, r: range) -> np.ndarray:
+        header = gdb_value["_M_t"]["_M_impl"]["_M_header"]
+        header_type = header.type.strip_typedefs()
+        offsets = {f.name: f.bitpos // 8 for f in header_type.fields()}
+        link_dtype = np.dtype(f"u{pointer_size(header['_M_left'])}")
+
+        def link(node: int, name: str) -> int:
+            return int(util.read_array(node + offsets[name], link_dtype, 1)[0])
+
+        # In-order walk, from the leftmost node
+        end = int(header.address)
+        node = int(header["_M_left"])
+        nodes = []
+        count = max(r[0], r[-1]) + 1
+        while node != end:
+            nodes.append(node)
+            if len(nodes) == count:
+                break
+
+            right = link(node, "_M_right")
+            if right:
+                node = right
+                while link(node, "_M_left"):
+                    node = link(node, "_M_left")
+            else:
+                parent = link(node, "_M_parent")
+                while node == link(parent, "_M_right"):
+                    node, parent = parent, link(parent, "_M_parent")
+                node = parent
+
+        return select_nodes(nodes, r, node_value_offset(header_type.sizeof, self.contained_type(gdb_value)))
+
+
+class StdUnorderedMap(NodeContainer):
+    """
+    std::unordered_map, as an array of its std::pair elements in iteration
+    order. The keys and values are the parallel arrays m.first and m.second
+    """
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+    name_prefixes = ("std::unordered_map",)
+
+    @staticmethod
+    def can_handle(gdb_type: gdb.Type) -> bool:
+        return str(gdb_type).startswith("std::unordered_map<")
+
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        return gdb_type.template_argument(4).template_argument(0)
+
+    def shape(self, gdb_value: gdb.Value) -> Tuple[Optional[int], ...]:
+        return (int(gdb_value["_M_h"]["_M_element_count"]),)
+
+    def element_addresses(self, gdb_value: gdb.Value, r: range) -> np.ndarray:
+        first = gdb_value["_M_h"]["_M_before_begin"]["_M_nxt"]
+        nodes = util.follow_links(int(first), 0, 0, pointer_size(first), max(r[0], r[-1]) + 1)
+        return select_nodes(nodes, r, node_value_offset(pointer_size(first), self.contained_type(gdb_value)))
+
+
+def record_fields(gdb_type: gdb.Type, offset: int = 0):
+    """
+    Yields the (name, type, byte offset, bit offset, bit size) of the data
+    members of a struct, including those of its base classes and anonymous
+    structs, in declaration order. Static members, anonymous unions and
+    unnamed bitfields are skipped
+    """
+    for field in gdb_type.fields():
+        if not hasattr(field, "bitpos"):
+            continue
+
+        field_type = gdb.types.get_basic_type(field.type)
+        field_offset = offset + field.bitpos // 8
+        if field.is_base_class or (not field.name and field_type.code == gdb.TYPE_CODE_STRUCT):
+            yield from record_fields(field_type, field_offset)
+        elif field.name:
+            yield field.name, field_type, field_offset, field.bitpos % 8, field.bitsize
+
+
+class Struct(ScalarTypeHandler):
+    """
+    Any struct or class whose data members can be extracted, as a NumPy
+    structured scalar. Structs without bitfields are read straight from
+    memory, so arrays of them are read in bulk into record arrays. Standard
+    library types other than std::pair are left alone, as their members are
+    implementation details
+    """
+    type_codes = (gdb.TYPE_CODE_STRUCT,)
+    library_prefixes = ("std::", "__gnu_cxx::")
+
+    @staticmethod
+    def can_handle(gdb_type: gdb.Type) -> bool:
+        name = str(gdb_type)
+        if name.startswith(Struct.library_prefixes) and not name.startswith("std::pair<"):
+            return False
+        return gdb_type.code == gdb.TYPE_CODE_STRUCT and len(gdb_type.fields()) > 0
+
+    def can_extract(self, gdb_type: gdb.Type) -> bool:
+        # Every data member must be extractable, as in extract
+        for _, field_type, _, _, bitsize in record_fields(gdb_type):
+            if field_type.code in (gdb.TYPE_CODE_PTR, gdb.TYPE_CODE_ENUM):
+                continue
+            if bitsize:
+                if util.scalar_dtype(field_type) is None:
+                    return False
+                continue
+            try:
+                self.type_set.get_handler(field_type)
+            except UnkownTypeError:
+                return False
+        return True
+
+    def field_dtype(self, gdb_type: gdb.Type) -> Optional[np.dtype]:
+        if gdb_type.code == gdb.TYPE_CODE_PTR:
+            # Pointers are kept as addresses
+            return np.dtype(f"u{gdb_type.sizeof}")
+        if gdb_type.code == gdb.TYPE_CODE_ENUM:
+            return np.dtype(f"i{gdb_type.sizeof}")
+
+        try:
+            plan = self.type_set.get_plan(gdb_type)
+        except UnkownTypeError:
+            return None
+
+        block = element_block(gdb_type, plan)
+        if block is None:
+            return None
+        dtype, shape = block
+        return dtype if shape == () else np.dtype((dtype, shape))
+
+    def dtype(self, gdb_type: gdb.Type) -> Optional[np.dtype]:
+        names, formats, offsets = [], [], []
+        for name, field_type, offset, _, bitsize in record_fields(gdb_type):
+            field_dtype = self.field_dtype(field_type)
+            if bitsize or field_dtype is None or name in names:
+                return None
+            names.append(name)
+            formats.append(field_dtype)
+            offsets.append(offset)
+
+        return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": gdb_type.sizeof})
+
     def extract(self, gdb_value: gdb.Value, index: Tuple[int, ...]):
-        return np.bool(gdb_value)
\ No newline at end of file
+        gdb_type = gdb_value.type.strip_typedefs()
+        dtype = self.get_plan(gdb_value).dtype
+        address = gdb_value.address
+        if dtype is not None and address is not None:
+            return util.read_array(int(address), dtype, 1)[0]
+
+        # Structs with bitfields, or that are not in memory, are extracted
+        # one member at a time
+        names, values = [], []
+        for name, field_type, _, _, bitsize in record_fields(gdb_type):
+            field_value = gdb_value[name]
+            if bitsize or field_type.code in (gdb.TYPE_CODE_PTR, gdb.TYPE_CODE_ENUM):
+                field_dtype = util.scalar_dtype(field_type)
+                if field_dtype is None:
+                    field_dtype = self.field_dtype(field_type)
+                value = field_dtype.type(int(field_value))
+            else:
+                value = self.type_set.get_handler(field_type).extract_all(field_value, [])
+            names.append(name)
+            values.append(np.asarray(value))
+
+        dtype = np.dtype([(name, value.dtype, value.shape) for name, value in zip(names, values)])
+        return np.array(tuple(values), dtype)[()]
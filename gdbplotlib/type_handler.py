@@ -1,3 +1,4 @@
+import itertools
 from abc import ABC, abstractmethod
 from typing import List, Tuple, Optional
 
@@ -5,11 +6,24 @@ import gdb.types  # pylint: disable=E0401
 import gdb  # pylint: disable=E0401
 import numpy as np
 
+from .memory import ReadBatch
+from .plan import Plan, element_block
 from .type_set import TypeSet
+from . import stats
 from . import util
 
 
+class JaggedDataError(Exception):
+    pass
+
+
 class TypeHandler(ABC):
+    # Optional dispatch hints. If given, can_handle is only called for types
+    # whose code is in type_codes, and whose name starts with one of
+    # name_prefixes
+    type_codes: Optional[Tuple[int, ...]] = None
+    name_prefixes: Optional[Tuple[str, ...]] = None
+
     @staticmethod
     @abstractmethod
     def can_handle(gdb_type: gdb.Type) -> bool:
@@ -26,6 +40,16 @@ class TypeHandler(ABC):
 
     def __init__(self, type_set: TypeSet):
         self.type_set = type_set
+        # Compiled by TypeSet.get_plan, for the one type this instance handles
+        self.plan: Optional[Plan] = None
+
+    def can_extract(self, gdb_type: gdb.Type) -> bool:
+        """
+        Returns whether a type accepted by can_handle can really be extracted,
+        for checks that need the type set, such as whether the types it is
+        made of are handled. The next handler is tried if not
+        """
+        return True
 
     @abstractmethod
     def shape(self, gdb_value: gdb.Value) -> Tuple[Optional[int], ...]:
@@ -71,35 +95,267 @@ class TypeHandler(ABC):
         """
         pass
 
-    def extract_all(self, gdb_value: gdb.Value, slices: List[slice]):
+    def data_address(self, gdb_value: gdb.Value) -> Optional[int]:
+        """
+        Gets the address of the elements of a container, if they are stored
+        contiguously in memory. Containers for which this is known allow the
+        elements to be read in bulk, rather than one at a time
+
+        Parameters:
+        gdb_value (gdb.Value): The container
+
+        Returns:
+        Optional[int]: The address of the first element. If the elements are
+                       not stored contiguously (in row-major order), None is
+                       returned
+        """
+        return None
+
+    def element_type(self, gdb_type: gdb.Type) -> Optional[gdb.Type]:
+        """
+        Layout hint. Gets the type of the elements of every container of a
+        given type, if it only depends on the type, so that the handler of the
+        elements is looked up once per type rather than once per value
+
+        Parameters:
+        gdb_type (gdb.Type): The container type
+
+        Returns:
+        Optional[gdb.Type]: The element type. If it can only be known from a
+                            value, None is returned, and contained_type is
+                            called for every value instead
+        """
+        return None
+
+    def fixed_layout(self, gdb_type: gdb.Type) -> Optional[Tuple[int, Tuple[int, ...]]]:
+        """
+        Layout hint. Gets where the elements of a container are stored, if
+        they are a fixed number of elements stored contiguously inside the
+        container itself (like std::array or a C-style array). Containers of
+        such containers can then be read in bulk too
+
+        Parameters:
+        gdb_type (gdb.Type): The container type
+
+        Returns:
+        Optional[Tuple[int, Tuple[int, ...]]]: The offset in bytes of the
+            first element from the start of the container, and the shape of
+            the elements. If the elements are not stored inside the container,
+            None is returned
+        """
+        return None
+
+    def compile_plan(self, gdb_type: gdb.Type) -> Plan:
+        element_type = self.element_type(gdb_type)
+        if element_type is None:
+            return Plan(self)
+
+        element_type = gdb.types.get_basic_type(element_type)
+        plan = Plan(self, contained_type=element_type, contained=self.type_set.get_plan(element_type))
+
+        layout = self.fixed_layout(gdb_type)
+        if layout is not None and plan.element_block is not None:
+            offset, shape = layout
+            plan.dtype, inner_shape = plan.element_block
+            plan.block_shape = tuple(shape) + inner_shape
+            plan.block_offset = offset
+
+        return plan
+
+    def get_plan(self, gdb_value: gdb.Value) -> Plan:
+        if self.plan is not None:
+            return self.plan
+        return self.type_set.get_plan(gdb.types.get_basic_type(gdb_value.type))
+
+    def _is_scalar(self, gdb_value: gdb.Value) -> bool:
+        plan = self.get_plan(gdb_value)
+        return plan.scalar or (plan.contained is None and self.contained_type(gdb_value) is None)
+
+    def _layout(self, gdb_value: gdb.Value, slices: List[slice]):
         shape = self.shape(gdb_value)
-        contained_type = self.contained_type(gdb_value)
         n_dims = len(shape)
-        scalar_type = (contained_type == None)
 
-        if scalar_type:
-            return self.extract(gdb_value, None)
+        plan = self.get_plan(gdb_value)
+        if plan.contained is not None:
+            contained_type, contained, block = plan.contained_type, plan.contained, plan.element_block
+        else:
+            contained_type = gdb.types.get_basic_type(self.contained_type(gdb_value))
+            contained = self.type_set.get_plan(contained_type)
+            block = element_block(contained_type, contained)
 
-        basic_contained_type = gdb.types.get_basic_type(contained_type)
-        contained_handler = self.type_set.get_handler(basic_contained_type)
         current_slices = slices[:n_dims]
         contained_slices = slices[n_dims:]
 
         for _ in range(len(shape) - len(current_slices)):
             current_slices.append(slice(None, None, None))
 
-        def gen_output(slc, shp, index):
-            if not shp:
-                contained_gdb_value = self.extract(gdb_value, index)
-                return contained_handler.extract_all(contained_gdb_value, contained_slices)
+        ranges = [util.slice_range(s, n) for s, n in zip(current_slices, shape)]
+        return shape, ranges, current_slices, contained_type, contained.handler, contained_slices, block
+
+    @staticmethod
+    def _block_selection(shape: Tuple[Optional[int], ...], current_slices: List[slice],
+                         block: Tuple[np.dtype, Tuple[int, ...]], contained_slices: List[slice]):
+        # The shape and slices of the container and its elements, read as one array
+        _, inner_shape = block
+        inner_slices = (list(contained_slices) + [slice(None)] * len(inner_shape))[:len(inner_shape)]
+        return tuple(shape) + inner_shape, list(current_slices) + inner_slices
+
+    def _elements(self, gdb_value: gdb.Value, shape: Tuple[Optional[int], ...], ranges: List[range],
+                  current_slices: List[slice], contained_type: gdb.Type):
+        if contained_type.code == gdb.TYPE_CODE_PTR:
+            address = self.data_address(gdb_value)
+            if address is not None:
+                # Pointers stored contiguously are read in one go, rather than
+                # as one gdb.Value each
+                pointer_dtype = np.dtype(f"u{contained_type.sizeof}")
+                pointers = util.read_contiguous(address, pointer_dtype, shape, current_slices)
+                return (gdb.Value(int(p)).cast(contained_type) for p in pointers.reshape(-1))
+
+        return (self.extract(gdb_value, index) for index in itertools.product(*ranges))
+
+    def _extract_at(self, addresses: np.ndarray, contained_type: gdb.Type, contained_handler: "TypeHandler",
+                    contained_slices: List[slice], block: Optional[Tuple[np.dtype, Tuple[int, ...]]],
+                    out: np.ndarray, batch: ReadBatch):
+        """
+        Extracts the elements at the given addresses into out, for containers
+        that know where their elements are without them being contiguous
+        """
+        if block is not None:
+            # Elements that turn out to be evenly spaced are read as one selection
+            dtype, inner_shape = block
+            itemsize = contained_type.sizeof
+            for start, stop, step in util.address_runs(addresses, itemsize):
+                span = abs(step) * (stop - start - 1) + 1
+                first = int(addresses[start]) if step > 0 else int(addresses[stop - 1])
+                run_slice = slice(None, None, step) if step > 0 else slice(span - 1, None, step)
+                full_shape, full_slices = self._block_selection((span,), [run_slice], block, contained_slices)
+                batch.add(first, dtype, full_shape, full_slices, out[start:stop])
+            return
+
+        pointer_type = contained_type.pointer()
+        elements = (gdb.Value(int(address)).cast(pointer_type).dereference() for address in addresses)
+        if isinstance(contained_handler, ScalarTypeHandler):
+            row = [contained_handler.extract(element, None) for element in elements]
+            if stats.enabled:
+                stats.count("element_extracts", len(row))
+            out[...] = np.array(row, out.dtype).reshape(out.shape)
+            return
+
+        for i, element in enumerate(elements):
+            if stats.enabled:
+                stats.count("element_extracts")
+            contained_handler.extract_into(element, contained_slices, out[i, ...], batch)
+
+    def result_layout(self, gdb_value: gdb.Value, slices: List[slice]) -> Tuple[Tuple[int, ...], np.dtype]:
+        """
+        Gets the shape and dtype of the array that extract_all will return,
+        sampling the first selected element of any nested containers
+
+        Parameters:
+        gdb_value (gdb.Value): GDB value
+        slices (List[slice]): The slices to be applied
+
+        Returns:
+        Tuple[Tuple[int, ...], np.dtype]: The shape and dtype of the output
+        """
+        if self._is_scalar(gdb_value):
+            dtype = self.get_plan(gdb_value).dtype
+            if dtype is None:
+                dtype = np.asarray(self.extract(gdb_value, None)).dtype
+            return (), dtype
+
+        shape, ranges, current_slices, _, contained_handler, contained_slices, block = \
+            self._layout(gdb_value, slices)
+        if block is not None:
+            full_shape, full_slices = self._block_selection(shape, current_slices, block, contained_slices)
+            return tuple(len(util.slice_range(s, n)) for s, n in zip(full_slices, full_shape)), block[0]
+
+        outer_shape = tuple(len(r) for r in ranges)
+        if 0 in outer_shape:
+            return outer_shape, np.dtype(np.float64)
+
+        first = self.extract(gdb_value, tuple(r[0] for r in ranges))
+        inner_shape, dtype = contained_handler.result_layout(first, contained_slices)
+        return outer_shape + inner_shape, dtype
+
+    def result_order(self, gdb_value: gdb.Value, slices: List[slice]) -> str:
+        """
+        Gets the memory order ("C" or "F") of the array that extract_all will
+        return, in which arrays passed to extract_into are best allocated
+
+        Parameters:
+        gdb_value (gdb.Value): GDB value
+        slices (List[slice]): The slices to be applied
+
+        Returns:
+        str: The order of the output
+        """
+        return "C"
+
+    def extract_into(self, gdb_value: gdb.Value, slices: List[slice], out: np.ndarray,
+                     batch: Optional[ReadBatch] = None):
+        """
+        Extracts the selected values of a GDB value into a preallocated array
+
+        Parameters:
+        gdb_value (gdb.Value): GDB value
+        slices (List[slice]): The slices to be applied
+        out (np.ndarray): The output array, with the shape and dtype given by
+                          result_layout
+        batch (Optional[ReadBatch]): If given, reads of contiguous elements
+                                     are added to the batch, and out is only
+                                     filled once the batch is executed
+        """
+        if self._is_scalar(gdb_value):
+            out[...] = self.extract(gdb_value, None)
+            return
+
+        shape, ranges, current_slices, contained_type, contained_handler, contained_slices, block = \
+            self._layout(gdb_value, slices)
+        outer_shape = tuple(len(r) for r in ranges)
+        if out.shape[:len(outer_shape)] != outer_shape:
+            raise JaggedDataError(f"Inconsistent element shapes: {out.shape} and {outer_shape}")
+
+        address = self.data_address(gdb_value) if block is not None else None
+        if address is not None:
+            full_shape, full_slices = self._block_selection(shape, current_slices, block, contained_slices)
+            if batch is not None:
+                batch.add(address, block[0], full_shape, full_slices, out)
             else:
-                out = []
-                for i in util.indices_1d(slc[0], shp[0]):
-                    out.append(gen_output(slc[1:], shp[1:], (*index, i)))
+                out[...] = util.read_contiguous(address, block[0], full_shape, full_slices)
+            return
+
+        elements = self._elements(gdb_value, shape, ranges, current_slices, contained_type)
+        if isinstance(contained_handler, ScalarTypeHandler):
+            # Gather the whole row of scalars before writing it in one go
+            row = [contained_handler.extract(element, None) for element in elements]
+            if stats.enabled:
+                stats.count("element_extracts", len(row))
+            out[...] = np.array(row, out.dtype).reshape(out.shape)
+            return
+
+        for out_index, contained_gdb_value in zip(np.ndindex(*outer_shape), elements):
+            if stats.enabled:
+                stats.count("element_extracts")
+            contained_handler.extract_into(contained_gdb_value, contained_slices, out[(*out_index, ...)], batch)
 
-                return out
+    def extract_all(self, gdb_value: gdb.Value, slices: List[slice]) -> np.ndarray:
+        if not self._is_scalar(gdb_value):
+            shape, _, current_slices, _, _, contained_slices, block = self._layout(gdb_value, list(slices))
+            address = self.data_address(gdb_value) if block is not None else None
+            if address is not None:
+                full_shape, full_slices = self._block_selection(shape, current_slices, block, contained_slices)
+                return util.read_contiguous(address, block[0], full_shape, full_slices)
 
-        out = gen_output(current_slices, shape, ())
+        shape, dtype = self.result_layout(gdb_value, list(slices))
+        out = np.empty(shape, dtype)
+
+        # The outer containers are walked first, gathering the addresses of
+        # every contiguous buffer, which are then read together
+        batch = ReadBatch()
+        self.extract_into(gdb_value, list(slices), out, batch)
+        with stats.timed("read"):
+            batch.execute()
         return out
 
 
@@ -109,3 +365,24 @@ class ScalarTypeHandler(TypeHandler):
 
     def contained_type(self, gdb_value: gdb.Value) -> Optional[gdb.Type]:
         return None
+
+    def dtype(self, gdb_type: gdb.Type) -> Optional[np.dtype]:
+        """
+        Gets the NumPy dtype with the same in-memory representation as the type
+
+        Parameters:
+        gdb_type (gdb.Type): Type to be handled
+
+        Returns:
+        Optional[np.dtype]: The dtype. If the raw memory of the type cannot be
+                            interpreted directly, None is returned, and values
+                            are extracted one at a time
+        """
+        return None
+
+    def compile_plan(self, gdb_type: gdb.Type) -> Plan:
+        dtype = self.dtype(gdb_type)
+        return Plan(self, scalar=True, dtype=dtype, block_shape=None if dtype is None else ())
+
+    def extract_all(self, gdb_value: gdb.Value, slices: List[slice]):
+        return self.extract(gdb_value, None)
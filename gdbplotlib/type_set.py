@@ -1,17 +1,103 @@
+import gdb  # pylint: disable=E0401
+
+from .plan import Plan
+from . import stats
+
+
 class UnkownTypeError(Exception):
     pass
 
 
+def type_key(gdb_type) -> tuple:
+    """
+    Gets a key that identifies a type. Named types are identified by their
+    name, but GDB prints every anonymous struct as "struct {...}", so unnamed
+    types are identified by their layout, and the types they refer to
+    """
+    if gdb_type.name:
+        return gdb_type.name, gdb_type.code
+
+    key = (str(gdb_type), gdb_type.code, gdb_type.sizeof)
+    if gdb_type.code in (gdb.TYPE_CODE_STRUCT, gdb.TYPE_CODE_UNION):
+        return key + tuple(
+            (f.name, getattr(f, "bitpos", None), f.bitsize, type_key(f.type)) for f in gdb_type.fields()
+        )
+    if gdb_type.code in (gdb.TYPE_CODE_PTR, gdb.TYPE_CODE_ARRAY, gdb.TYPE_CODE_REF, gdb.TYPE_CODE_TYPEDEF):
+        return key + (type_key(gdb_type.target()),)
+    return key
+
+
 class TypeSet:
     def __init__(self):
         self.handlers = []
+        # Catch-all handlers, which are only tried after every registered
+        # handler, however late that was registered
+        self.fallbacks = []
+        self.cache = {}
+        self.code_index = {}
+
+        gdb.events.new_objfile.connect(self.clear_cache)
+        gdb.events.clear_objfiles.connect(self.clear_cache)
 
     def register(self, type_handler):
         self.handlers.append(type_handler)
+        self.code_index.clear()
+        self.clear_cache()
+
+    def register_fallback(self, type_handler):
+        self.fallbacks.append(type_handler)
+        self.code_index.clear()
+        self.clear_cache()
+
+    def clear_cache(self, event=None):
+        self.cache.clear()
+
+    def candidates(self, code, name):
+        if code not in self.code_index:
+            self.code_index[code] = [
+                h for h in self.handlers + self.fallbacks if getattr(h, "type_codes", None) is None or code in h.type_codes
+            ]
+
+        for handler in self.code_index[code]:
+            prefixes = getattr(handler, "name_prefixes", None)
+            if prefixes is None or name.startswith(prefixes):
+                yield handler
 
     def get_handler(self, gdb_type):
-        for handler in self.handlers:
-            if handler.can_handle(gdb_type):
-                return handler(self)
+        name = gdb_type.name or str(gdb_type)
+        key = type_key(gdb_type)
+        handler = self.cache.get(key)
+        if handler is not None:
+            if stats.enabled:
+                stats.count("handler_cache_hits")
+            return handler
+
+        with stats.timed("dispatch"):
+            if stats.enabled:
+                stats.count("handler_resolutions")
+            for handler in self.candidates(gdb_type.code, name):
+                if handler.can_handle(gdb_type):
+                    instance = handler(self)
+                    if instance.can_extract(gdb_type):
+                        self.cache[key] = instance
+                        return instance
 
         raise UnkownTypeError(f"Cannot handle type: {str(gdb_type)}")
+
+    def get_plan(self, gdb_type) -> Plan:
+        """
+        Gets the extraction plan of a type, compiling it the first time the
+        type is seen. Plans are kept by the type's handler instance, so they
+        are dropped along with it
+        """
+        handler = self.get_handler(gdb_type)
+        if handler.plan is None:
+            with stats.timed("compile"):
+                if stats.enabled:
+                    stats.count("plan_compiles")
+                # Types that contain themselves (through pointers) see this
+                # placeholder, and resolve their elements for every value
+                handler.plan = Plan(handler)
+                handler.plan = handler.compile_plan(gdb_type)
+
+        return handler.plan
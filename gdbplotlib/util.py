@@ -1,8 +1,17 @@
 import re
 from typing import List, Tuple, Optional
 
+import gdb  # pylint: disable=E0401
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
 
-def indices_1d(s: slice, shape: int):
+from . import cache
+
+STRIDED_READ_CHUNK = 1 << 20
+SPARSE_READ_GAP = 1 << 16
+
+
+def slice_range(s: slice, shape: Optional[int]) -> range:
     if shape is None:
         start = 0 if s.start is None else s.start
         stop = 0 if s.stop is None else s.stop
@@ -10,11 +19,18 @@ def indices_1d(s: slice, shape: int):
     else:
         start, stop, step = s.indices(shape)
 
-    in_range = lambda a, b, c: a < b if c > 0 else a > b
-    i = start
-    while in_range(i, stop, step):
-        yield i
-        i += step
+    return range(start, stop, step)
+
+
+def range_slice(r: range, bounded: bool = True) -> slice:
+    # A negative stop means "before the first element" for a range, but
+    # counts from the end of a bounded container for a slice
+    stop = r.stop if r.stop >= 0 or not bounded else None
+    return slice(r.start, stop, r.step)
+
+
+def indices_1d(s: slice, shape: int):
+    yield from slice_range(s, shape)
 
 
 def indices(slices: List[slice], shape: Tuple):
@@ -43,4 +59,152 @@ def split_variable_and_slice(var: str) -> Tuple[str, Optional[str]]:
 
 
 def strip_non_alphanumeric(s: str) -> str:
-    return re.sub("\\W+", "", s)
\ No newline at end of file
+    return re.sub("\\W+", "", s)
+
+
+def is_signed(gdb_type: gdb.Type) -> bool:
+    if hasattr(gdb_type, "is_signed"):
+        return gdb_type.is_signed
+    return not str(gdb_type).startswith("unsigned")
+
+
+def scalar_dtype(gdb_type: gdb.Type) -> Optional[np.dtype]:
+    if gdb_type.code == gdb.TYPE_CODE_FLT:
+        kind = "f"
+    elif gdb_type.code == gdb.TYPE_CODE_BOOL:
+        kind = "b"
+    elif gdb_type.code in (gdb.TYPE_CODE_INT, gdb.TYPE_CODE_CHAR):
+        kind = "i" if is_signed(gdb_type) else "u"
+    else:
+        return None
+
+    try:
+        return np.dtype(f"{kind}{gdb_type.sizeof}")
+    except TypeError:
+        return None
+
+
+def alignof(gdb_type: gdb.Type) -> int:
+    if getattr(gdb_type, "alignof", None):
+        return gdb_type.alignof
+    # Older GDBs do not know the alignment, so the largest power of two
+    # dividing the size (up to 16) is used instead
+    size = max(gdb_type.sizeof, 1)
+    return min(size & -size, 16)
+
+
+def address_runs(addresses: np.ndarray, itemsize: int):
+    """
+    Splits a sequence of element addresses into runs with a constant stride
+    that is a non-zero multiple of the element size, so that each run can be
+    read as one strided selection
+
+    Yields:
+    Tuple[int, int, int]: The index of the first element of the run, the
+                          index one past its last element, and the stride in
+                          elements
+    """
+    n = len(addresses)
+    diffs = np.diff(addresses.astype(np.int64))
+    # Indices of the differences that differ from the one before them
+    changes = np.flatnonzero(diffs[1:] != diffs[:-1]) + 1
+
+    start = 0
+    while start < n:
+        stop, step = start + 1, 1
+        if stop < n and diffs[start] != 0 and diffs[start] % itemsize == 0:
+            step = int(diffs[start]) // itemsize
+            i = np.searchsorted(changes, start, side="right")
+            stop = (int(changes[i]) if i < len(changes) else n - 1) + 1
+        yield start, stop, step
+        start = stop
+
+
+def follow_links(address: int, next_offset: int, end: int, pointer_size: int, limit: int) -> List[int]:
+    """
+    Gets the addresses of the nodes of a linked list, by following the
+    pointers at next_offset of each node until end is reached
+    """
+    pointer_dtype = np.dtype(f"u{pointer_size}")
+    nodes = []
+    while address != end and len(nodes) < limit:
+        nodes.append(address)
+        address = int(read_array(address + next_offset, pointer_dtype, 1)[0])
+    return nodes
+
+
+def read_array(address: int, dtype: np.dtype, count: int) -> np.ndarray:
+    if count <= 0:
+        return np.empty(0, dtype)
+    buffer = cache.page_cache.read(address, count * dtype.itemsize)
+    return np.frombuffer(buffer, dtype, count)
+
+
+def element_strides(shape: Tuple[Optional[int], ...]) -> List[int]:
+    strides = [1] * len(shape)
+    for i in range(len(shape) - 2, -1, -1):
+        strides[i] = strides[i + 1] * shape[i + 1]
+    return strides
+
+
+def selection_span(strides: List[int], ranges: List[range]) -> Tuple[int, int, int]:
+    """
+    Gets the element offsets of the first selected element, and of the lowest
+    and one past the highest selected elements, of a non-empty selection
+    """
+    first = sum(r[0] * st for r, st in zip(ranges, strides))
+    lo = sum(min(r[0], r[-1]) * st for r, st in zip(ranges, strides))
+    hi = sum(max(r[0], r[-1]) * st for r, st in zip(ranges, strides)) + 1
+    return first, lo, hi
+
+
+def is_dense(lo: int, hi: int, count: int, itemsize: int) -> bool:
+    return (hi - lo) * itemsize <= STRIDED_READ_CHUNK or hi - lo <= 2 * count
+
+
+def _read_ranges(address: int, dtype: np.dtype, strides: List[int], ranges: List[range]) -> np.ndarray:
+    itemsize = dtype.itemsize
+    out_shape = tuple(len(r) for r in ranges)
+    if 0 in out_shape:
+        return np.empty(out_shape, dtype)
+
+    first, lo, hi = selection_span(strides, ranges)
+    count = int(np.prod(out_shape))
+
+    if is_dense(lo, hi, count, itemsize):
+        data = read_array(address + lo * itemsize, dtype, hi - lo)
+        byte_strides = tuple(r.step * st * itemsize for r, st in zip(ranges, strides))
+        return as_strided(data[first - lo:], out_shape, byte_strides, writeable=False)
+
+    # The selection is too sparse to read in one go, so split it along the
+    # outermost dimension (the one with the largest stride) into pieces
+    # spanning roughly STRIDED_READ_CHUNK bytes
+    axis = max(range(len(ranges)), key=lambda i: strides[i])
+    outer = ranges[axis]
+    inner_strides = strides[:axis] + strides[axis + 1:]
+    inner = ranges[:axis] + ranges[axis + 1:]
+    if len(outer) == 1:
+        row_address = address + outer[0] * strides[axis] * itemsize
+        return np.expand_dims(_read_ranges(row_address, dtype, inner_strides, inner), axis)
+
+    n_pieces = -(-(hi - lo) * itemsize // STRIDED_READ_CHUNK)
+    piece = max(1, len(outer) // n_pieces)
+    if abs(outer.step) * strides[axis] * itemsize >= SPARSE_READ_GAP:
+        # Rows this far apart are read one by one, rather than along with
+        # everything in between them
+        piece = 1
+    pieces = [_read_ranges(address, dtype, strides, [*ranges[:axis], outer[i:i + piece], *ranges[axis + 1:]])
+              for i in range(0, len(outer), piece)]
+    return np.concatenate(pieces, axis=axis)
+
+
+def read_contiguous(address: int, dtype: np.dtype, shape: Tuple[Optional[int], ...],
+                    slices: List[slice], strides: Optional[List[int]] = None) -> np.ndarray:
+    """
+    Reads a selection of an array stored at the given address. The array is
+    in C order, unless its strides (in elements) are given, as for the
+    column-major matrices of Eigen. The result is a view of the data read,
+    with the same order as the array in memory
+    """
+    ranges = [slice_range(s, n) for s, n in zip(slices, shape)]
+    return _read_ranges(address, dtype, element_strides(shape) if strides is None else list(strides), ranges)
@@ -0,0 +1,225 @@
+from typing import Optional, Tuple
+
+import gdb  # pylint: disable=E0401
+import gdb.types  # pylint: disable=E0401
+import numpy as np
+
+from . import data_extractor
+from . import stats
+from . import std_types
+from .default import default
+from .figures import Figure, draw
+from .plot import Legend, PlottingError, series_1d
+
+
+class WatchedVariable:
+    def __init__(self, var: str):
+        self.var = var
+        self.data = None
+        self.vector = None
+        self.next_vector = None
+        self.appended = False
+
+    def vector_state(self) -> Optional[Tuple[int, int]]:
+        """
+        Gets the start address and size of the variable, if it is an unsliced
+        std::vector, whose elements can be appended between stops
+        """
+        base_var, var_slice = data_extractor.parse_var(self.var)
+        if var_slice:
+            return None
+
+        try:
+            gdb_value = gdb.parse_and_eval(base_var)
+        except gdb.error:
+            # Field projections such as pts.x are not expressions GDB knows
+            return None
+        handler = default.get_handler(gdb.types.get_basic_type(gdb_value.type))
+        if not isinstance(handler, std_types.StdVector):
+            return None
+
+        return int(gdb_value["_M_impl"]["_M_start"]), handler.shape(gdb_value)[0]
+
+    def read_expression(self) -> str:
+        """
+        Gets what needs to be read to update the variable: the whole variable,
+        unless it is a vector that has grown in place, in which case only its
+        new tail is read, along with the last element read before, to check
+        that the elements already read have not changed. Only that element is
+        checked, as checking any more would mean reading them all again
+        """
+        self.next_vector = self.vector_state()
+        vector = self.next_vector
+        self.appended = (
+            vector is not None and self.vector is not None and self.data is not None and self.data.ndim == 1
+            and vector[0] == self.vector[0] and vector[1] > self.vector[1]
+        )
+
+        if not self.appended:
+            return self.var
+        old_size, new_size = self.vector[1], vector[1]
+        return f"{self.var}[{max(old_size - 1, 0)}:{new_size}]"
+
+    def update(self, read: np.ndarray) -> np.ndarray:
+        """
+        Updates the variable with what was read for its read_expression
+        """
+        read = np.atleast_1d(read)
+        if not self.appended:
+            self.data = read
+        elif self.vector[1] == 0:
+            self.data = read
+        elif read[:1].tobytes() == self.data[-1:].tobytes():
+            self.data = np.concatenate([self.data, read[1:]])
+            if stats.enabled:
+                stats.count("watch_tail_reads")
+        else:
+            # The vector has changed in place as well as grown
+            self.data = np.atleast_1d(data_extractor.extract_vars([self.var])[0])
+
+        self.vector = self.next_vector
+        return self.data
+
+
+def update_variables(variables) -> list:
+    """
+    Updates watched variables, reading all of them together
+    """
+    reads = data_extractor.extract_vars([v.read_expression() for v in variables])
+    return [v.update(read) for v, read in zip(variables, reads)]
+
+
+class Watch:
+    """
+    A figure of line plots, which is updated in place every time the
+    inferior stops. Lines are animated artists, redrawn by blitting over a
+    saved background while the axes limits stay the same
+    """
+
+    def __init__(self, variables):
+        import matplotlib.pyplot as plt
+
+        self.variables = [WatchedVariable(v) for v in variables]
+        self.background = None
+
+        figure = Figure()
+        legend = Legend()
+        self.n_series = []
+        for variable, data in zip(self.variables, update_variables(self.variables)):
+            series = series_1d(variable.var, data)
+            self.n_series.append(len(series))
+            for label, y in series:
+                figure.plot(y, animated=True)
+                legend.add(label)
+
+        legend.apply(figure)
+        figure.grid()
+
+        plt.ion()
+        self.fig = draw(figure)
+        self.ax = self.fig.axes[0]
+        self.lines = list(self.ax.lines)
+        self.fig.canvas.mpl_connect("draw_event", self.on_draw)
+        self.fig.canvas.mpl_connect("close_event", lambda event: unwatch(self))
+        self.fig.show()
+
+    def on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_lines()
+
+    def draw_lines(self):
+        for line in self.lines:
+            self.ax.draw_artist(line)
+
+    def update(self):
+        lines = iter(self.lines)
+        for variable, n_series, data in zip(self.variables, self.n_series, update_variables(self.variables)):
+            series = series_1d(variable.var, data)
+            if len(series) != n_series:
+                raise gdb.GdbError(f"Shape of watched variable has changed: {variable.var}")
+            for _, y in series:
+                next(lines).set_data(np.arange(len(y)), y)
+
+        limits = (self.ax.get_xlim(), self.ax.get_ylim())
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+        canvas = self.fig.canvas
+        if self.background is not None and limits == (self.ax.get_xlim(), self.ax.get_ylim()):
+            canvas.restore_region(self.background)
+            self.draw_lines()
+            canvas.blit(self.fig.bbox)
+        else:
+            canvas.draw_idle()
+        canvas.flush_events()
+
+
+watches = []
+
+
+def on_stop(event):
+    for watch in list(watches):
+        try:
+            watch.update()
+        except (gdb.error, data_extractor.VariableError) as e:
+            gdb.write(f"plotwatch: {e}\n", gdb.STDERR)
+        except (gdb.GdbError, PlottingError) as e:
+            # The plot cannot show the variables any more, so stop updating it
+            gdb.write(f"plotwatch: {e}, closing the watch\n", gdb.STDERR)
+            close(watch)
+
+
+def unwatch(watch: Watch):
+    if watch not in watches:
+        return
+
+    watches.remove(watch)
+    if not watches:
+        gdb.events.stop.disconnect(on_stop)
+
+
+def close(watch: Watch):
+    import matplotlib.pyplot as plt
+
+    plt.close(watch.fig)
+    unwatch(watch)
+
+
+class PlotWatch(gdb.Command):
+    """
+    Plot variables, and update the plot every time the program stops.
+    Usage: plotwatch VAR...
+
+    A std::vector that has grown without moving is updated by reading only
+    its new elements, and its last old element to check that it has not
+    changed. Changes to its other old elements are then not shown; use
+    unwatch and plotwatch again to read it in full.
+    """
+
+    def __init__(self):
+        super(PlotWatch, self).__init__("plotwatch", gdb.COMMAND_OBSCURE)
+
+    @stats.timed("plot")
+    def invoke(self, args, from_tty):
+        if not args.split():
+            raise gdb.GdbError("Usage: plotwatch VAR...")
+
+        watch = Watch(args.split())
+        if not watches:
+            gdb.events.stop.connect(on_stop)
+        watches.append(watch)
+
+
+class Unwatch(gdb.Command):
+    def __init__(self):
+        super(Unwatch, self).__init__("unwatch", gdb.COMMAND_OBSCURE)
+
+    def invoke(self, args, from_tty):
+        names = set(args.split())
+        for watch in list(watches):
+            if not names or names.intersection(v.var for v in watch.variables):
+                close(watch)
+
+
+PlotWatch()
+Unwatch()
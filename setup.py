@@ -11,7 +11,7 @@ setuptools.setup(
     url='https://github.com/X-Neon/gdbplotlib',
     packages=setuptools.find_packages(),
     install_requires=['numpy', 'matplotlib'],
-    python_requires='>=3',
+    python_requires='>=3.8',
     description='Plotting and exporting of variables from GDB',
     long_description=long_description,
     long_description_content_type='text/markdown',